@@ -0,0 +1,27 @@
+"""Латентность проверки bcrypt по уровням стоимости и результат калибровки.
+
+Запуск: uv run python benchmarks/bench_bcrypt.py [--min-rounds 4] [--max-rounds 14] [--target-ms 250]
+"""
+import argparse
+
+from auth_app.core.security import calibrate_bcrypt_rounds, measure_bcrypt_verify
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--min-rounds", type=int, default=4)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    print(f"{'cost':<6}{'verify ms':>12}{'verify/s':>12}")
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        seconds = measure_bcrypt_verify(rounds)
+        print(f"{rounds:<6}{seconds * 1000:>12.2f}{1 / seconds:>12,.1f}")
+
+    chosen = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"calibrated cost for {args.target_ms:g} ms target: {chosen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Микробенчмарк: encode/decode access токенов через PyJWT и через HMACCodec.
+
+Запуск: uv run python benchmarks/bench_jwt.py [--seconds 2]
+"""
+import argparse
+import time
+import warnings
+
+from auth_app.core.config import settings
+from auth_app.core.jwt_codec import HMACCodec, PyJWTCodec
+
+
+def _payload() -> dict:
+    now = int(time.time())
+    return {"sub": "42", "type": "access", "iat": now, "exp": now + 900, "iss": settings.app_name}
+
+
+def _ops_per_sec(func, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    payload = _payload()
+    codecs = {
+        "pyjwt": PyJWTCodec(settings.jwt_secret_key, settings.jwt_algorithm),
+        "hmac": HMACCodec(settings.jwt_secret_key, settings.jwt_algorithm),
+    }
+    reference = codecs["pyjwt"].encode(payload)
+    assert codecs["hmac"].encode(payload) == reference, "tokens differ from PyJWT"
+    assert codecs["hmac"].decode(reference) == codecs["pyjwt"].decode(reference)
+
+    print(f"{'codec':<8}{'encode ops/s':>16}{'decode ops/s':>16}")
+    for name, codec in codecs.items():
+        encode = _ops_per_sec(lambda: codec.encode(payload), args.seconds)
+        decode = _ops_per_sec(lambda: codec.decode(reference), args.seconds)
+        print(f"{name:<8}{encode:>16,.0f}{decode:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
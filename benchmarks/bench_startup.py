@@ -0,0 +1,93 @@
+"""Стоимость инициализации схемы при старте воркера.
+
+Сравнивает прежний drop_all + create_all, проверку версии при актуальной схеме
+и холодный старт --workers воркеров одновременно (каждый со своим пулом, как
+отдельные процессы): миграции должен применить ровно один. Всё выполняется во
+временной схеме, рабочие таблицы не затрагиваются.
+
+Запуск: DATABASE_URL=... uv run python benchmarks/bench_startup.py [--iterations 20] [--workers 8]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from auth_app.core.config import settings
+from auth_app.core.schema import MIGRATIONS, ensure_schema
+from auth_app.domain.models import Base
+
+
+BENCH_SCHEMA = "bench_startup"
+
+
+def _bench_engine() -> AsyncEngine:
+    return create_async_engine(
+        settings.database_url,
+        connect_args={"server_settings": {"search_path": BENCH_SCHEMA}},
+    )
+
+
+async def _reset_schema(target: AsyncEngine) -> None:
+    async with target.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+
+
+async def _recreate(target: AsyncEngine) -> None:
+    async with target.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def _timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - started) / iterations
+
+
+async def _cold_start(workers: int) -> tuple[float, int]:
+    engines = [_bench_engine() for _ in range(workers)]
+    try:
+        started = time.perf_counter()
+        applied = await asyncio.gather(*(ensure_schema(target) for target in engines))
+        return time.perf_counter() - started, sum(applied)
+    finally:
+        await asyncio.gather(*(target.dispose() for target in engines))
+
+
+async def _main(args: argparse.Namespace) -> None:
+    target = _bench_engine()
+    try:
+        await _reset_schema(target)
+        recreate = await _timed(lambda: _recreate(target), args.iterations)
+
+        await _reset_schema(target)
+        await ensure_schema(target)
+        check = await _timed(lambda: ensure_schema(target), args.iterations)
+
+        await _reset_schema(target)
+        cold, applied = await _cold_start(args.workers)
+
+        print(f"drop_all + create_all:      {recreate * 1000:>10.2f} ms")
+        print(f"schema version check:       {check * 1000:>10.2f} ms")
+        print(f"cold start, {args.workers:>3} workers:    {cold * 1000:>10.2f} ms")
+        print(f"migrations applied:         {applied:>10} (expected {len(MIGRATIONS)})")
+    finally:
+        async with target.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await target.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Размер индекса и латентность поиска: hex varchar + unique B-tree против bytea + hash-индекс.
+
+Создаёт во временной схеме таблицы на --rows строк (по умолчанию 10M, займёт
+несколько минут и несколько ГБ), затем ищет случайные существующие ключи.
+
+Запуск: DATABASE_URL=... uv run python benchmarks/bench_token_index.py [--rows 10000000] [--lookups 20000]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from auth_app.core.db import engine
+
+
+VARIANTS = {
+    "hex_btree": ("text", "encode(sha256(i::text::bytea), 'hex')", "CREATE UNIQUE INDEX ON {table} (token_hash)"),
+    "bytea_btree": ("bytea", "sha256(i::text::bytea)", "CREATE UNIQUE INDEX ON {table} (token_hash)"),
+    "bytea_hash": ("bytea", "sha256(i::text::bytea)", "CREATE INDEX ON {table} USING hash (token_hash)"),
+}
+
+
+async def _prepare(conn, table: str, column_type: str, expression: str, index_sql: str, rows: int) -> None:
+    await conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    await conn.execute(text(f"CREATE TABLE {table} (id bigint, token_hash {column_type})"))
+    await conn.execute(text(f"INSERT INTO {table} SELECT i, {expression} FROM generate_series(1, {rows}) AS i"))
+    await conn.execute(text(index_sql.format(table=table)))
+    await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def _lookup_latency(conn, table: str, expression: str, keys: list[int]) -> tuple[float, float]:
+    stmt = text(f"SELECT id FROM {table} WHERE token_hash = (SELECT {expression} FROM (SELECT :i AS i) AS k)")
+    timings = []
+    for key in keys:
+        started = time.perf_counter()
+        await conn.execute(stmt, {"i": key})
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return sum(timings) / len(timings), timings[int(len(timings) * 0.99)]
+
+
+async def _main(args: argparse.Namespace) -> None:
+    keys = [random.randint(1, args.rows) for _ in range(args.lookups)]
+    print(f"{'variant':<14}{'index MB':>10}{'table MB':>10}{'avg us':>10}{'p99 us':>10}")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE SCHEMA IF NOT EXISTS bench"))
+        for name, (column_type, expression, index_sql) in VARIANTS.items():
+            table = f"bench.token_{name}"
+            async with engine.begin() as conn:
+                await _prepare(conn, table, column_type, expression, index_sql, args.rows)
+            async with engine.connect() as conn:
+                index_size = await conn.scalar(text(f"SELECT pg_indexes_size('{table}')"))
+                table_size = await conn.scalar(text(f"SELECT pg_table_size('{table}')"))
+                avg, p99 = await _lookup_latency(conn, table, expression, keys)
+            print(
+                f"{name:<14}{index_size / 2**20:>10.1f}{table_size / 2**20:>10.1f}"
+                f"{avg * 1e6:>10.0f}{p99 * 1e6:>10.0f}",
+                flush=True,
+            )
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP SCHEMA IF EXISTS bench CASCADE"))
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--keep", action="store_true", help="не удалять таблицы после прогона")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Проверка маршрутизации запросов между основной БД и репликой.
+
+Нужны DATABASE_URL и хотя бы одна реплика в DATABASE_READ_URLS (для проверки
+логики подойдёт и второй URL на тот же сервер). Каждый запрос помечается тем
+движком, через который он ушёл, и скрипт проверяет:
+  1. чтение в чистой единице работы идёт в реплику;
+  2. запись идёт в основную БД;
+  3. чтение сразу после записи в той же единице работы остаётся на основной БД;
+  4. промах на реплике перепроверяется на основной БД.
+Создаёт одного пользователя с случайным именем и удаляет его в конце.
+
+Запуск: DATABASE_URL=... DATABASE_READ_URLS='["..."]' uv run python benchmarks/check_read_routing.py
+"""
+import asyncio
+import secrets
+import sys
+
+from sqlalchemy import delete, event
+
+from auth_app.core.db import dispose_engines, engine, read_engines
+from auth_app.core.db_manager import DBManager
+from auth_app.core.schema import ensure_schema
+from auth_app.domain.models import User
+
+
+def _track(log: list[str]) -> None:
+    for label, target in [("primary", engine), *(("replica", read_engine) for read_engine in read_engines)]:
+
+        @event.listens_for(target.sync_engine, "before_cursor_execute")
+        def _record(conn, cursor, statement, parameters, context, executemany, label=label):
+            # служебные запросы диалекта при первом подключении не считаем
+            if statement.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+                log.append(label)
+
+
+def _check(title: str, log: list[str], expected: list[str]) -> bool:
+    ok = log == expected
+    print(f"{'ok' if ok else 'FAIL':<6}{title}: {log} (expected {expected})", flush=True)
+    log.clear()
+    return ok
+
+
+async def _main() -> bool:
+    if not read_engines:
+        print("DATABASE_READ_URLS is empty: nothing to check", file=sys.stderr)
+        return False
+    await ensure_schema(engine)
+    log: list[str] = []
+    _track(log)
+    name = f"routing-check-{secrets.token_hex(4)}"
+    results = []
+    try:
+        async with DBManager() as db:
+            await db.users.get_user_by_name("routing-check-warmup")
+        log.clear()
+
+        async with DBManager() as db:
+            await db.users.get_user_by_id(0)
+            # промах перепроверяется на основной БД
+            results.append(_check("read in a fresh unit of work, miss re-checked", log, ["replica", "primary"]))
+
+            user = await db.users.create_user(name, "not-a-real-hash")
+            results.append(_check("write", log, ["primary"]))
+
+            await db.users.get_user_by_id(user.id)
+            results.append(_check("read after write", log, ["primary"]))
+            await db.commit()
+        log.clear()
+
+        async with DBManager() as db:
+            found = await db.users.get_user_by_name(name)
+            # реплика могла ещё не получить строку — тогда её дочитает основная БД
+            expected = ["replica"] if log == ["replica"] else ["replica", "primary"]
+            results.append(_check("read in a new unit of work", log, expected))
+            results.append(found is not None)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(User).where(User.name == name))
+        await dispose_engines()
+    return all(results)
+
+
+def main() -> None:
+    sys.exit(0 if asyncio.run(_main()) else 1)
+
+
+if __name__ == "__main__":
+    main()
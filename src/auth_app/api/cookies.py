@@ -0,0 +1,26 @@
+from fastapi import Response
+
+from auth_app.core.config import settings
+
+
+def set_session_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key=settings.session_cookie_name,
+        value=token,
+        httponly=False,
+        secure=settings.session_cookie_secure,
+        samesite="lax",
+        max_age=settings.session_ttl_minutes * 60,
+        domain=settings.session_cookie_domain,
+        path="/",
+    )
+
+
+def clear_session_cookie(response: Response) -> None:
+    response.delete_cookie(
+        key=settings.session_cookie_name,
+        domain=settings.session_cookie_domain,
+        samesite="lax",
+        secure=settings.session_cookie_secure,
+        path="/",
+    )
@@ -1,22 +1,26 @@
+import secrets
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, Request, status
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, HTTPException, Request, Response, status
 
+from auth_app.api.cookies import set_session_cookie
+from auth_app.core.cache import session_cache, session_epoch_cache, user_cache
 from auth_app.core.config import settings
-from auth_app.core.db import SessionLocal, get_session
+from auth_app.core.db import SessionLocal
 from auth_app.core.db_manager import DBManager
-from auth_app.domain.models import User, UserSession
+from auth_app.core.exceptions import InvalidSessionCookieError
+from auth_app.core.metrics import timed
+from auth_app.core.revocation import revocation_list
+from auth_app.domain.schemas import UserRead
+from auth_app.domain.session_store import SessionRecord, SessionStore, get_session_store
 from auth_app.core.security import security
+from auth_app.core.session_cookie import session_cookies
+from auth_app.core.singleflight import session_flight
 from auth_app.core.tokens import tokens
 
 
-SessionDep = Annotated[AsyncSession, Depends(get_session)]
-
-
 async def get_db_manager() -> DBManager:
     async with DBManager(SessionLocal) as manager:
         yield manager
@@ -25,7 +29,23 @@ async def get_db_manager() -> DBManager:
 DBManagerDep = Annotated[DBManager, Depends(get_db_manager)]
 
 
-async def get_current_user_from_bearer(request: Request, session: SessionDep) -> User:
+def require_admin(request: Request) -> None:
+    """Пускает только с admin_token в X-Admin-Token или Authorization: Bearer; без настройки закрыто для всех.
+
+    Bearer нужен для Prometheus, который умеет только его.
+    """
+    token = settings.admin_token
+    provided = request.headers.get("x-admin-token")
+    authorization = request.headers.get("authorization")
+    if provided is None and authorization and authorization.lower().startswith("bearer "):
+        provided = authorization.split(" ", 1)[1].strip()
+    if not token or provided is None or not secrets.compare_digest(provided.encode(), token.encode()):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin token required")
+
+
+@timed("deps.access_payload")
+async def get_access_payload(request: Request, db: DBManagerDep) -> dict:
+    """Проверенный payload access токена; БД трогаем только при срабатывании фильтра отзыва."""
     raw_token = _extract_access_token(request)
     try:
         payload = tokens.decode_token(raw_token, expected_type="access")
@@ -33,79 +53,175 @@ async def get_current_user_from_bearer(request: Request, session: SessionDep) ->
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Token expired") from None
     except jwt.InvalidTokenError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token") from None
+    if await revocation_list.is_revoked(db, payload):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Token revoked")
+    return payload
+
+
+AccessPayloadDep = Annotated[dict, Depends(get_access_payload)]
+
+
+@timed("deps.bearer_user")
+async def get_current_user_from_bearer(payload: AccessPayloadDep, db: DBManagerDep) -> UserRead:
     user_id = int(payload["sub"])
-    user = await session.get(User, user_id)
+    if "name" in payload and "created_at" in payload:
+        return UserRead(id=user_id, name=payload["name"], created_at=payload["created_at"])
+    user = await _load_user(db, user_id)
     if not user:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
     return user
 
 
+@timed("deps.session_user")
 async def get_current_user_from_session(
-    request: Request, session: SessionDep
-) -> User:
-    token_hash = _get_session_token_hash(request)
-    stored_session = await _find_session(session, token_hash)
+    request: Request, response: Response, db: DBManagerDep
+) -> UserRead:
     now = datetime.now(timezone.utc)
-    absolute_expires_at = await _ensure_not_absolute_expired(session, stored_session, now)
-    await _extend_if_needed(session, stored_session, now, absolute_expires_at)
-    await _check_expiry(session, stored_session, now)
-    user = await _get_session_user(session, stored_session)
+    if settings.session_mode == "cookie":
+        return await _get_cookie_session_user(request, response, db, now)
+    token_hash = _get_session_token_hash(request)
+    cached = session_cache.get(token_hash, now.timestamp())
+    if cached is not None:
+        return cached
+    # параллельные запросы с одной кукой разделяют один поход в хранилище
+    # поколение до чтения: logout посреди загрузки не даст закэшировать удалённую сессию
+    generation = session_cache.generation(token_hash)
+    return await session_flight.do(token_hash, lambda: _load_session_user(db, token_hash, now, generation))
+
+
+async def _load_session_user(db: DBManager, token_hash: bytes, now: datetime, generation: int) -> UserRead:
+    store = get_session_store(db)
+    stored_session = await _find_session(store, token_hash)
+    absolute_expires_at = await _ensure_not_absolute_expired(store, stored_session, now)
+    await _extend_if_needed(store, stored_session, now, absolute_expires_at)
+    await _check_expiry(store, stored_session, now)
+    user = await _get_session_user(db, store, stored_session)
+    _cache_session(token_hash, stored_session, absolute_expires_at, user, generation)
+    return user
+
+
+async def _get_cookie_session_user(
+    request: Request, response: Response, db: DBManager, now: datetime
+) -> UserRead:
+    """Проверка stateless-сессии: расшифровка куки и сверка эпохи отзыва из кэша.
+
+    Rolling-продление перевыпускает куку в ответе вместо записи в БД.
+    """
+    raw_token = request.cookies.get(settings.session_cookie_name)
+    if not raw_token:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "No session cookie")
+    try:
+        cookie = session_cookies.decode(raw_token)
+    except InvalidSessionCookieError:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Session not found") from None
+    timestamp = now.timestamp()
+    if min(cookie.expires_at, cookie.absolute_expires_at) <= timestamp:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Session expired")
+    epoch = await _load_session_epoch(db, cookie.user_id)
+    if epoch is None:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
+    if epoch != cookie.epoch:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Session revoked")
+    user = await _load_user(db, cookie.user_id)
+    if not user:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
+    if timestamp - cookie.issued_at >= settings.session_rolling_interval_minutes * 60:
+        absolute_expires_at = datetime.fromtimestamp(cookie.absolute_expires_at, timezone.utc)
+        expires_at = min(now + timedelta(minutes=settings.session_extend_minutes), absolute_expires_at)
+        token = session_cookies.issue(cookie.user_id, cookie.epoch, now, expires_at, absolute_expires_at)
+        set_session_cookie(response, token)
     return user
 
 
-def _get_session_token_hash(request: Request) -> str:
+async def _load_session_epoch(db: DBManager, user_id: int) -> int | None:
+    """Эпоха отзыва через короткоживущий кэш, при промахе — из БД."""
+    epoch = session_epoch_cache.get(user_id)
+    if epoch is None:
+        epoch = await db.users.get_session_epoch(user_id)
+        if epoch is not None:
+            session_epoch_cache.set(user_id, epoch)
+    return epoch
+
+
+def _get_session_token_hash(request: Request) -> bytes:
     raw_token = request.cookies.get(settings.session_cookie_name)
     if not raw_token:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "No session cookie")
     return tokens.hash_session_token(raw_token)
 
 
-async def _find_session(session: SessionDep, token_hash: str) -> UserSession:
-    stmt = select(UserSession).where(UserSession.token_hash == token_hash)
-    stored_session = await session.scalar(stmt)
+async def _find_session(store: SessionStore, token_hash: bytes) -> SessionRecord:
+    stored_session = await store.get_session(token_hash)
     if not stored_session:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Session not found")
     return stored_session
 
 
-def _absolute_deadline(stored_session: UserSession) -> datetime:
+def _absolute_deadline(stored_session: SessionRecord) -> datetime:
     return stored_session.created_at + timedelta(days=settings.session_absolute_timeout_days)
 
 
 async def _ensure_not_absolute_expired(
-    session: SessionDep, stored_session: UserSession, now: datetime
+    store: SessionStore, stored_session: SessionRecord, now: datetime
 ) -> datetime:
     absolute_expires_at = _absolute_deadline(stored_session)
     if now >= absolute_expires_at:
-        await _expire_session(session, stored_session, "Session expired")
+        await _expire_session(store, stored_session, "Session expired")
     return absolute_expires_at
 
 
 async def _extend_if_needed(
-    session: SessionDep, stored_session: UserSession, now: datetime, absolute_expires_at: datetime
+    store: SessionStore, stored_session: SessionRecord, now: datetime, absolute_expires_at: datetime
 ) -> None:
     if (now - stored_session.last_refreshed_at) >= timedelta(minutes=settings.session_rolling_interval_minutes):
-        new_expiry = now + timedelta(minutes=settings.session_extend_minutes)
-        stored_session.expires_at = min(new_expiry, absolute_expires_at)
+        new_expiry = min(now + timedelta(minutes=settings.session_extend_minutes), absolute_expires_at)
+        await store.extend_session(stored_session, new_expiry, now)
+        stored_session.expires_at = new_expiry
         stored_session.last_refreshed_at = now
-        await session.commit()
 
 
-async def _check_expiry(session: SessionDep, stored_session: UserSession, now: datetime) -> None:
+async def _check_expiry(store: SessionStore, stored_session: SessionRecord, now: datetime) -> None:
     if stored_session.expires_at <= now:
-        await _expire_session(session, stored_session, "Session expired")
+        await _expire_session(store, stored_session, "Session expired")
 
 
-async def _get_session_user(session: SessionDep, stored_session: UserSession) -> User:
-    user = await session.get(User, stored_session.user_id)
+async def _get_session_user(db: DBManager, store: SessionStore, stored_session: SessionRecord) -> UserRead:
+    user = await _load_user(db, stored_session.user_id)
     if not user:
-        await _expire_session(session, stored_session, "User not found")
+        await _expire_session(store, stored_session, "User not found")
     return user
 
 
-async def _expire_session(session: SessionDep, stored_session: UserSession, message: str) -> None:
-    await session.delete(stored_session)
-    await session.commit()
+async def _load_user(db: DBManager, user_id: int) -> UserRead | None:
+    """Профиль пользователя через короткоживущий кэш, при промахе — из БД."""
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = await db.users.get_user_by_id(user_id)
+    if not user:
+        return None
+    user_read = UserRead.model_validate(user)
+    user_cache.set(user_id, user_read)
+    return user_read
+
+
+def _cache_session(
+    token_hash: bytes,
+    stored_session: SessionRecord,
+    absolute_expires_at: datetime,
+    user: UserRead,
+    generation: int,
+) -> None:
+    """Кэширует сессию не дольше её срока и до момента следующего rolling-продления."""
+    next_extension_at = stored_session.last_refreshed_at + timedelta(
+        minutes=settings.session_rolling_interval_minutes
+    )
+    deadline = min(stored_session.expires_at, absolute_expires_at, next_extension_at)
+    session_cache.set(token_hash, user, expires_at=deadline.timestamp(), generation=generation)
+
+
+async def _expire_session(store: SessionStore, stored_session: SessionRecord, message: str) -> None:
+    await store.delete_session(stored_session.token_hash)
     raise HTTPException(status.HTTP_401_UNAUTHORIZED, message)
 
 
@@ -0,0 +1,70 @@
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth_app.core import metrics
+from auth_app.core.config import settings
+from auth_app.core.profiler import profiler
+
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Латентность и число обращений к БД по маршрутам, опционально Server-Timing."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_metrics, token = metrics.begin_request()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.metrics_server_timing:
+                    request_metrics.stages["total"] = time.perf_counter() - started
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", request_metrics.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.end_request(token)
+            # шаблон маршрута, а не путь: иначе по метке на каждый id
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            metrics.request_latency.observe((method, route_path, str(status_code)), time.perf_counter() - started)
+            metrics.request_round_trips.observe((method, route_path), request_metrics.db_round_trips)
+
+
+class ProfilerMiddleware:
+    """Профилирует выбранные SamplingProfiler запросы и пишет speedscope-файл."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not profiler.should_profile(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        recording = profiler.begin(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            try:
+                path = await profiler.finish(recording)
+            except OSError:
+                logger.exception("Failed to write profile of %s", recording.name)
+            else:
+                logger.info("Profile of %s written to %s", recording.name, path)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, status
+
+from auth_app.api.dependencies import DBManagerDep
+from auth_app.core.config import settings
+from auth_app.domain.schemas import IntrospectRequest, IntrospectResponse
+from auth_app.domain.services import IntrospectionService
+
+
+router = APIRouter(prefix="/auth", tags=["Introspection"])
+
+
+@router.post("/introspect", summary="Пакетная проверка session-токенов и access JWT")
+async def introspect(data: IntrospectRequest, db: DBManagerDep) -> IntrospectResponse:
+    if len(data.tokens) > settings.introspect_max_tokens:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many tokens, limit is {settings.introspect_max_tokens}",
+        )
+    service = IntrospectionService(db)
+    return IntrospectResponse(results=await service.introspect(data.tokens))
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Request, Response, status
+
+from auth_app.core.config import settings
+from auth_app.core.tokens import tokens
+
+
+router = APIRouter(tags=["JWKS"])
+
+
+@router.get("/.well-known/jwks.json", summary="Публичные ключи для проверки JWT")
+async def jwks(request: Request) -> Response:
+    body, etag = tokens.jwks()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,15 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
 from auth_app.core.config import settings
-from auth_app.api.dependencies import DBManagerDep, get_current_user_from_bearer
+from auth_app.api.dependencies import AccessPayloadDep, DBManagerDep, get_current_user_from_bearer
 from auth_app.core.exceptions import (
     AppError,
     InvalidCredentialsError,
+    PasswordHasherBusyError,
     RefreshTokenExpiredError,
     RefreshTokenNotFoundError,
     UserNotFoundError,
 )
-from auth_app.domain.models import User
 from auth_app.domain.schemas import LoginRequest, RefreshRequest, TokenPair, UserRead
 from auth_app.domain.services import AuthServiceJWT
 
@@ -40,6 +40,17 @@ def _set_token_cookies(response: Response, access_token: str, refresh_token: str
     )
 
 
+def _clear_token_cookies(response: Response) -> None:
+    for key in (settings.access_cookie_name, settings.refresh_cookie_name):
+        response.delete_cookie(
+            key=key,
+            domain=settings.session_cookie_domain,
+            samesite="lax",
+            secure=settings.session_cookie_secure,
+            path="/",
+        )
+
+
 @router.post("/login/jwt", summary="Вход через JWT (access + refresh)")
 async def login_with_jwt(
     data: LoginRequest, response: Response, db: DBManagerDep
@@ -49,6 +60,8 @@ async def login_with_jwt(
         access_token, refresh_token = await jwt_service.login(data.name, data.password)
     except InvalidCredentialsError as err:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=str(err)) from err
+    except PasswordHasherBusyError as err:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, try again later") from err
     except AppError as err:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
     _set_token_cookies(response, access_token, refresh_token)
@@ -77,6 +90,30 @@ async def refresh_tokens(
     return pair
 
 
+@router.post("/logout/jwt", summary="Выход: отзыв текущего access токена и refresh токена из куки")
+async def logout_jwt(
+    payload: AccessPayloadDep, request: Request, response: Response, db: DBManagerDep
+) -> dict:
+    jwt_service = AuthServiceJWT(db)
+    try:
+        await jwt_service.logout(payload, request.cookies.get(settings.refresh_cookie_name))
+    except AppError as err:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
+    _clear_token_cookies(response)
+    return {"detail": "Logged out"}
+
+
+@router.post("/logout/jwt/all", summary="Выход на всех устройствах")
+async def logout_jwt_everywhere(payload: AccessPayloadDep, response: Response, db: DBManagerDep) -> dict:
+    jwt_service = AuthServiceJWT(db)
+    try:
+        revoked = await jwt_service.logout_all(int(payload["sub"]))
+    except AppError as err:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
+    _clear_token_cookies(response)
+    return {"detail": "Logged out everywhere", "revoked_refresh_tokens": revoked}
+
+
 @router.get("/me/jwt", summary="Профиль по JWT (access)")
-async def me_jwt(user: User = Depends(get_current_user_from_bearer)) -> UserRead:
+async def me_jwt(user: UserRead = Depends(get_current_user_from_bearer)) -> UserRead:
     return user
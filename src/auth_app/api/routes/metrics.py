@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from auth_app.api.dependencies import require_admin
+from auth_app.core.cache import cache_stats
+from auth_app.core.metrics import render_metrics
+
+
+router = APIRouter(tags=["Служебное"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/metrics", summary="Метрики в формате Prometheus", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(cache_stats()), media_type="text/plain; version=0.0.4")
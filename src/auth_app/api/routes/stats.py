@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+
+from auth_app.api.dependencies import require_admin
+from auth_app.core.cache import cache_stats
+from auth_app.core.db import pool_status
+from auth_app.core.partition_maintainer import partition_maintainer
+from auth_app.core.profiler import profiler
+from auth_app.core.reaper import reaper
+from auth_app.core.revocation import revocation_list
+from auth_app.core.singleflight import singleflight_stats
+
+
+router = APIRouter(prefix="/stats", tags=["Служебное"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/caches", summary="Счётчики in-process кэшей")
+async def caches() -> dict[str, dict]:
+    return cache_stats()
+
+
+@router.get("/reaper", summary="Сколько истёкших строк удалил фоновый reaper")
+async def reaper_stats() -> dict:
+    return reaper.stats()
+
+
+@router.get("/partitions", summary="Сколько секций создано и удалено")
+async def partitions() -> dict:
+    return partition_maintainer.stats()
+
+
+@router.get("/revocation", summary="Фильтр отозванных access токенов")
+async def revocation_stats() -> dict:
+    return revocation_list.stats()
+
+
+@router.get("/singleflight", summary="Сколько одновременных запросов склеено в один")
+async def singleflight() -> dict[str, dict]:
+    return singleflight_stats()
+
+
+@router.get("/profiler", summary="Сколько запросов профилировано и отклонено лимитом")
+async def profiler_stats() -> dict:
+    return profiler.stats()
+
+
+@router.get("/pool", summary="Состояние пула соединений с БД")
+async def pool() -> dict:
+    return pool_status()
@@ -3,7 +3,7 @@ from fastapi import APIRouter, HTTPException, status
 from auth_app.api.dependencies import DBManagerDep
 from auth_app.domain.schemas import UserCreate, UserRead
 from auth_app.domain.services import UserService
-from auth_app.core.exceptions import AppError, UserAlreadyExistsError
+from auth_app.core.exceptions import AppError, PasswordHasherBusyError, UserAlreadyExistsError
 
 
 router = APIRouter(prefix="/auth", tags=["Пользователи"])
@@ -20,6 +20,8 @@ async def register(data: UserCreate, db: DBManagerDep) -> UserRead:
         return await service.register(data.name, data.password)
     except UserAlreadyExistsError as err:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="User already exists") from err
+    except PasswordHasherBusyError as err:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, try again later") from err
     except AppError as err:
         detail = str(err) or "Bad request"
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=detail) from err
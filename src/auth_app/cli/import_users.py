@@ -0,0 +1,219 @@
+"""Потоковый импорт пользователей из CSV (колонки name,password) или JSONL.
+
+Файл читается построчно, пароли хэшируются в пуле процессов, пачки пишутся
+многострочным INSERT или через COPY во временную таблицу. Уже занятые имена
+пропускаются до хэширования. После каждой пачки в checkpoint-файл пишется
+смещение в байтах, повторный запуск продолжает с него.
+
+Запуск: auth-import-users users.csv [--format csv|jsonl] [--chunk-size N]
+        [--workers N] [--method insert|copy] [--checkpoint PATH] [--restart]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import any_, bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_app.core.db import SessionLocal, engine
+from auth_app.core.security import security
+from auth_app.domain.models import User
+from auth_app.domain.repositories import UserRepository
+
+
+# asyncpg ограничивает запрос 32767 параметрами, на строку их два
+MAX_INSERT_CHUNK = 16_000
+
+
+def _hash_passwords(passwords: list[str], rounds: int) -> list[str]:
+    """Выполняется в дочернем процессе; стоимость передаётся из родителя."""
+    return [security.hash_password(password, rounds) for password in passwords]
+
+
+def _read_chunks(
+    path: Path, fmt: str, offset: int, chunk_size: int
+) -> Iterator[tuple[list[tuple[str, str]], int]]:
+    """Отдаёт пачки (name, password) и смещение конца пачки в байтах; в памяти одна пачка.
+
+    Пароли не обрезаются: пробелы по краям — часть пароля. CSV читается одним
+    csv.reader, поэтому поля в кавычках могут содержать переводы строк.
+    """
+    # readline, а не итерация по файлу: иначе TextIOWrapper запрещает tell()
+    with path.open(encoding="utf-8", newline="") as file:
+        lines = iter(file.readline, "")
+        if fmt == "csv":
+            reader = csv.reader(lines)
+            columns = next(reader, [])
+            if columns:
+                columns[0] = columns[0].removeprefix("\ufeff")
+            offset = max(offset, file.tell())
+        # смещения берутся из tell() на границе записи, для UTF-8 это позиция в байтах
+        file.seek(offset)
+        if fmt == "csv":
+            records = (dict(zip(columns, row)) for row in reader if row)
+        else:
+            records = (json.loads(line) for line in lines if line.strip())
+        rows: list[tuple[str, str]] = []
+        for record in records:
+            rows.append((record["name"], record["password"]))
+            if len(rows) >= chunk_size:
+                yield rows, file.tell()
+                rows = []
+        if rows:
+            yield rows, file.tell()
+
+
+class Checkpoint:
+    """Смещение во входном файле и счётчики; пишется атомарно через os.replace."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+        self.imported = 0
+        self.skipped = 0
+        if path.exists():
+            data = json.loads(path.read_text())
+            self.offset, self.imported, self.skipped = data["offset"], data["imported"], data["skipped"]
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"offset": self.offset, "imported": self.imported, "skipped": self.skipped}))
+        os.replace(tmp, self.path)
+
+
+async def _filter_existing(rows: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Убирает повторы внутри пачки и имена, которые уже есть в БД, — их не нужно хэшировать."""
+    unique = dict(rows)
+    stmt = select(User.name).where(User.name == any_(bindparam("names", type_=ARRAY(User.name.type))))
+    async with SessionLocal() as session:
+        existing = set(await session.scalars(stmt, {"names": list(unique)}))
+    return [(name, password) for name, password in unique.items() if name not in existing]
+
+
+async def _hash_rows(pool: Executor, workers: int, rows: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    loop = asyncio.get_running_loop()
+    rounds = security.rounds
+    step = max(len(rows) // workers, 1)
+    parts = [rows[start : start + step] for start in range(0, len(rows), step)]
+    hashed = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, _hash_passwords, [password for _, password in part], rounds)
+            for part in parts
+        )
+    )
+    return [
+        (name, password_hash)
+        for part, hashes in zip(parts, hashed)
+        for (name, _), password_hash in zip(part, hashes)
+    ]
+
+
+async def _write_insert(session: AsyncSession, rows: list[tuple[str, str]]) -> int:
+    created = 0
+    for start in range(0, len(rows), MAX_INSERT_CHUNK):
+        created += len(await UserRepository(session).create_users(rows[start : start + MAX_INSERT_CHUNK]))
+    return created
+
+
+async def _write_copy(session: AsyncSession, rows: list[tuple[str, str]]) -> int:
+    """COPY во временную таблицу и один INSERT ... SELECT ... ON CONFLICT DO NOTHING."""
+    await session.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS import_users (name text, password_hash text) "
+            "ON COMMIT DELETE ROWS"
+        )
+    )
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "import_users", records=rows, columns=["name", "password_hash"]
+    )
+    result = await session.execute(
+        text(
+            "INSERT INTO users (name, password_hash) SELECT name, password_hash FROM import_users "
+            "ON CONFLICT (name) DO NOTHING"
+        )
+    )
+    return result.rowcount
+
+
+async def _write_chunk(method: str, rows: list[tuple[str, str]]) -> int:
+    if not rows:
+        return 0
+    async with SessionLocal() as session:
+        created = await (_write_copy if method == "copy" else _write_insert)(session, rows)
+        await session.commit()
+    return created
+
+
+async def _main(args: argparse.Namespace) -> None:
+    path = Path(args.path)
+    fmt = args.format or ("jsonl" if path.suffix in (".jsonl", ".ndjson") else "csv")
+    checkpoint_path = Path(args.checkpoint or f"{path}.checkpoint")
+    if args.restart:
+        checkpoint_path.unlink(missing_ok=True)
+    checkpoint = Checkpoint(checkpoint_path)
+    print(f"bcrypt cost {security.calibrate()}", flush=True)
+    if checkpoint.offset:
+        print(f"resuming from byte {checkpoint.offset} ({checkpoint.imported} imported)", flush=True)
+
+    started = time.perf_counter()
+    processed = 0
+    pool = ProcessPoolExecutor(max_workers=args.workers)
+    write_task: asyncio.Task | None = None
+
+    async def write(rows: list[tuple[str, str]], total: int, end_offset: int) -> None:
+        nonlocal processed
+        created = await _write_chunk(args.method, rows)
+        checkpoint.offset = end_offset
+        checkpoint.imported += created
+        checkpoint.skipped += total - created
+        checkpoint.save()
+        processed += total
+        elapsed = time.perf_counter() - started
+        print(
+            f"offset={end_offset} imported={checkpoint.imported} skipped={checkpoint.skipped} "
+            f"rate={processed / elapsed:.0f} rows/s",
+            flush=True,
+        )
+
+    try:
+        for rows, end_offset in _read_chunks(path, fmt, checkpoint.offset, args.chunk_size):
+            # хэширование следующей пачки идёт, пока предыдущая пишется в БД
+            hashed = await _hash_rows(pool, args.workers, await _filter_existing(rows))
+            if write_task is not None:
+                await write_task
+            write_task = asyncio.create_task(write(hashed, len(rows), end_offset))
+        if write_task is not None:
+            await write_task
+    finally:
+        pool.shutdown(cancel_futures=True)
+        await engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"done: {processed} rows in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.0f} rows/s)", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV с заголовком name,password или JSONL с полями name и password")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="по умолчанию — по расширению файла")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов для bcrypt")
+    parser.add_argument("--method", choices=["insert", "copy"], default="insert")
+    parser.add_argument("--checkpoint", help="по умолчанию <path>.checkpoint")
+    parser.add_argument("--restart", action="store_true", help="игнорировать checkpoint и начать сначала")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Онлайн-миграция token_hash из hex-строки (varchar) в 32-байтный bytea с hash-индексом.
+
+Шаг подготовки (по умолчанию) работает под нагрузкой старой версии приложения:
+  1. добавляет колонку token_digest bytea и триггер, заполняющий её у новых
+     и изменённых строк;
+  2. пачками по первичному ключу заполняет token_digest у существующих строк,
+     повторяя проходы, пока не останется ни одной строки с NULL;
+  3. строит hash-индекс CREATE INDEX CONCURRENTLY и проверяет CHECK NOT NULL
+     без долгой блокировки (NOT VALID + VALIDATE).
+Шаг --finalize — короткая транзакция на время выкладки новой версии: удаляет
+старую колонку с её уникальным индексом, переименовывает token_digest в
+token_hash и делает её NOT NULL.
+
+Запуск: auth-migrate-token-hashes [--batch-size N] [--sleep-ms N] [--finalize]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from auth_app.core.db import engine
+
+
+TABLES = ("sessions", "refresh_tokens")
+
+
+async def _column_type(conn, table: str, column: str) -> str | None:
+    return await conn.scalar(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column},
+    )
+
+
+async def _prepare(table: str) -> None:
+    async with engine.begin() as conn:
+        if await _column_type(conn, table, "token_hash") == "bytea":
+            print(f"{table}: already migrated", flush=True)
+            return
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS token_digest bytea"))
+        await conn.execute(
+            text(
+                f"""
+                CREATE OR REPLACE FUNCTION {table}_token_digest() RETURNS trigger AS $$
+                BEGIN
+                    NEW.token_digest := decode(NEW.token_hash, 'hex');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """
+            )
+        )
+        await conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_token_digest ON {table}"))
+        await conn.execute(
+            text(
+                f"CREATE TRIGGER {table}_token_digest BEFORE INSERT OR UPDATE OF token_hash ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {table}_token_digest()"
+            )
+        )
+
+
+def _backfill_statement(table: str, first: bool):
+    # обход по первичному ключу: каждая пачка продолжает с места предыдущей, а не сканирует заполненное
+    after = "" if first else "AND id > :last_id"
+    return text(
+        f"""
+        WITH batch AS (
+            SELECT id FROM {table}
+            WHERE token_digest IS NULL {after}
+            ORDER BY id LIMIT :batch_size
+        ), updated AS (
+            UPDATE {table} SET token_digest = decode({table}.token_hash, 'hex')
+            FROM batch WHERE {table}.id = batch.id AND {table}.token_digest IS NULL
+            RETURNING 1
+        )
+        SELECT (SELECT id FROM batch ORDER BY id DESC LIMIT 1), (SELECT count(*) FROM updated)
+        """
+    )
+
+
+async def _has_unfilled(table: str) -> bool:
+    async with engine.connect() as conn:
+        return await conn.scalar(text(f"SELECT 1 FROM {table} WHERE token_digest IS NULL LIMIT 1")) is not None
+
+
+async def _backfill(table: str, batch_size: int, sleep_seconds: float) -> int:
+    """Заполняет token_digest, пока в таблице не останется ни одной строки с NULL.
+
+    Строки, вставленные до появления триггера транзакциями, которые закоммитились
+    позже прохода, подхватывает следующий проход.
+    """
+    total = 0
+    started = time.perf_counter()
+    while True:
+        last_id = None
+        while True:
+            async with engine.begin() as conn:
+                if await _column_type(conn, table, "token_digest") is None:
+                    return total
+                params = {"batch_size": batch_size}
+                if last_id is not None:
+                    params["last_id"] = last_id
+                stmt = _backfill_statement(table, first=last_id is None)
+                last_id, updated = (await conn.execute(stmt, params)).one()
+            total += updated
+            if last_id is None:
+                break
+            print(f"{table}: {total} rows ({total / (time.perf_counter() - started):.0f} rows/s)", flush=True)
+            await asyncio.sleep(sleep_seconds)
+        if not await _has_unfilled(table):
+            return total
+        print(f"{table}: rows with empty token_digest remain, starting another pass", flush=True)
+        await asyncio.sleep(sleep_seconds)
+
+
+async def _build_index(table: str) -> None:
+    # CONCURRENTLY нельзя внутри транзакции
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if await _column_type(conn, table, "token_digest") is None:
+            return
+        await conn.execute(
+            text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_token_digest "
+                f"ON {table} USING hash (token_digest)"
+            )
+        )
+        # проверенный CHECK позволяет SET NOT NULL в --finalize обойтись без скана таблицы
+        await conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_token_digest_not_null"))
+        await conn.execute(
+            text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_token_digest_not_null "
+                f"CHECK (token_digest IS NOT NULL) NOT VALID"
+            )
+        )
+        await conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_token_digest_not_null"))
+
+
+async def _finalize(table: str) -> None:
+    async with engine.begin() as conn:
+        if await _column_type(conn, table, "token_digest") is None:
+            print(f"{table}: nothing to finalize", flush=True)
+            return
+        await conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+        # строки, вставленные до появления триггера и не попавшие в backfill
+        await conn.execute(
+            text(f"UPDATE {table} SET token_digest = decode(token_hash, 'hex') WHERE token_digest IS NULL")
+        )
+        await conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_token_digest ON {table}"))
+        await conn.execute(text(f"DROP FUNCTION IF EXISTS {table}_token_digest()"))
+        await conn.execute(text(f"ALTER TABLE {table} DROP COLUMN token_hash"))
+        await conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN token_digest TO token_hash"))
+        await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN token_hash SET NOT NULL"))
+        await conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_token_digest_not_null"))
+        await conn.execute(text(f"ALTER INDEX ix_{table}_token_digest RENAME TO ix_{table}_token_hash"))
+    print(f"{table}: finalized", flush=True)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        for table in TABLES:
+            if args.finalize:
+                await _finalize(table)
+                continue
+            await _prepare(table)
+            await _backfill(table, args.batch_size, args.sleep_ms / 1000)
+            await _build_index(table)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--sleep-ms", type=int, default=50)
+    parser.add_argument("--finalize", action="store_true", help="переключиться на новую колонку")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
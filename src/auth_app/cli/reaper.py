@@ -0,0 +1,37 @@
+"""Удаление истёкших сессий и refresh токенов (например, из cron).
+
+Запуск: auth-reaper [--batch-size N] [--sleep-ms N] [--loop]
+"""
+import argparse
+import asyncio
+import logging
+
+from auth_app.core.config import settings
+from auth_app.core.db import engine
+from auth_app.core.reaper import reaper
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        while True:
+            removed = await reaper.run_once(batch_size=args.batch_size, sleep_ms=args.sleep_ms)
+            print(f"removed {removed} in {reaper.last_run_seconds:.2f}s", flush=True)
+            if not args.loop:
+                break
+            await asyncio.sleep(settings.reaper_interval_seconds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.reaper_batch_size)
+    parser.add_argument("--sleep-ms", type=int, default=settings.reaper_batch_sleep_ms)
+    parser.add_argument("--loop", action="store_true", help="повторять каждые REAPER_INTERVAL_SECONDS")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
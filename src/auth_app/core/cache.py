@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+from auth_app.core.config import settings
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_registry: dict[str, "TTLCache"] = {}
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный LRU-кэш, где у каждой записи свой срок жизни (unix-время)."""
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float | None = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # поколения ключей, сброшенных через invalidate; ограничены тем же max_size
+        self._generations: OrderedDict[K, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        _registry[name] = self
+
+    def get(self, key: K, now: float | None = None) -> V | None:
+        """Возвращает значение, если оно есть и ещё не истекло."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        deadline, value = entry
+        if (now if now is not None else time.time()) >= deadline:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self, key: K) -> int:
+        """Текущее поколение ключа; берётся до чтения источника и передаётся в set."""
+        return self._generations.get(key, 0)
+
+    def set(self, key: K, value: V, expires_at: float | None = None, generation: int | None = None) -> None:
+        """Кладёт значение; срок жизни — меньшее из expires_at и ttl_seconds.
+
+        С generation запись пропускается, если ключ успели сбросить после
+        того, как значение было прочитано из источника.
+        """
+        if generation is not None and generation != self._generations.get(key, 0):
+            return
+        deadline = expires_at if expires_at is not None else float("inf")
+        if self.ttl_seconds is not None:
+            deadline = min(deadline, time.time() + self.ttl_seconds)
+        if self.max_size <= 0:
+            return
+        self._data[key] = (deadline, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """Удаляет запись и сдвигает поколение ключа, чтобы уже начатые чтения её не вернули."""
+        self._data.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._generations.move_to_end(key)
+        while len(self._generations) > max(self.max_size, 1):
+            self._generations.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """Счётчики попаданий, промахов и вытеснений."""
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def cache_stats() -> dict[str, dict]:
+    """Статистика всех созданных кэшей по имени."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+session_cache: TTLCache = TTLCache(
+    "sessions", settings.session_cache_max_size, settings.session_cache_ttl_seconds
+)
+user_cache: TTLCache = TTLCache("users", settings.user_cache_max_size, settings.user_cache_ttl_seconds)
+session_epoch_cache: TTLCache = TTLCache(
+    "session_epochs", settings.session_epoch_cache_max_size, settings.session_epoch_cache_ttl_seconds
+)
+refresh_grace_cache: TTLCache = TTLCache(
+    "refresh_grace", settings.refresh_grace_max_size, settings.refresh_grace_seconds
+)
+token_cache: TTLCache = TTLCache("verified_tokens", settings.jwt_cache_max_size)
@@ -1,13 +1,120 @@
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import asyncio
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from auth_app.core.config import settings
+from auth_app.core.schema import ensure_schema
 from auth_app.domain.models import Base
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+# время открытия новых соединений внутри текущего checkout (контекст свой у каждой задачи)
+_checkout_connect_seconds: ContextVar[float] = ContextVar("checkout_connect_seconds", default=0.0)
+
+
+class PoolWaitStats:
+    """Сколько раз и как долго запросы ждали соединение из пула.
+
+    Ожидание в очереди и открытие новых соединений считаются отдельно:
+    первое — признак нехватки пула, второе — латентность до Postgres.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.timeouts += timed_out
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_connect(self, seconds: float) -> None:
+        self.connects += 1
+        self.connect_seconds_total += seconds
+        self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, замеряющий ожидание соединения и время открытия новых."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        token = _checkout_connect_seconds.set(0.0)
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self._record_wait(started, timed_out=True)
+            raise
+        except Exception:
+            # ошибка connect: в ожидание идёт только время до него
+            self._record_wait(started)
+            raise
+        else:
+            self._record_wait(started)
+            return connection
+        finally:
+            _checkout_connect_seconds.reset(token)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.wait_stats.record_connect(elapsed)
+            _checkout_connect_seconds.set(_checkout_connect_seconds.get() + elapsed)
+
+    def _record_wait(self, started: float, timed_out: bool = False) -> None:
+        elapsed = time.perf_counter() - started - _checkout_connect_seconds.get()
+        self.wait_stats.record(max(elapsed, 0.0), timed_out=timed_out)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={"statement_cache_size": settings.db_statement_cache_size},
+    )
+
+
+engine = _create_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+read_engines = [_create_engine(url) for url in settings.database_read_urls]
+_read_session_factories = itertools.cycle(
+    [async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession) for read_engine in read_engines]
+)
+
+
+def _read_session() -> AsyncSession:
+    """Сессия к следующей реплике по кругу."""
+    return next(_read_session_factories)()
+
+
+ReadSessionLocal: Callable[[], AsyncSession] | None = _read_session if read_engines else None
+
 
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
@@ -15,6 +122,60 @@ async def get_session() -> AsyncSession:
 
 
 async def init_db() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+    if settings.db_schema_mode == "skip":
+        return
+    if settings.db_schema_mode == "recreate":
+        # только для разработки: удаляет все данные
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+    await ensure_schema(engine)
+
+
+async def prewarm_pool(connections: int) -> None:
+    """Заранее открывает соединения ко всем БД, чтобы первые запросы не ждали connect."""
+    connections = min(connections, settings.db_pool_size)
+    await asyncio.gather(*(_prewarm_engine(target, connections) for target in [engine, *read_engines]))
+
+
+async def _prewarm_engine(target: AsyncEngine, connections: int) -> None:
+    barrier = asyncio.Barrier(connections)
+
+    async def _open() -> None:
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            # держим соединение, пока не откроются все, иначе пул вернёт одно и то же
+            await barrier.wait()
+
+    await asyncio.gather(*(_open() for _ in range(connections)))
+
+
+async def dispose_engines() -> None:
+    await asyncio.gather(*(target.dispose() for target in [engine, *read_engines]))
+
+
+def pool_status() -> dict:
+    """Состояние пулов основной БД и реплик."""
+    return {
+        "primary": _engine_pool_status(engine),
+        "replicas": [_engine_pool_status(read_engine) for read_engine in read_engines],
+    }
+
+
+def _engine_pool_status(target: AsyncEngine) -> dict:
+    pool = target.pool
+    wait_stats = pool.wait_stats
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_max_overflow,
+        "checkouts": wait_stats.checkouts,
+        "timeouts": wait_stats.timeouts,
+        "wait_seconds_total": wait_stats.wait_seconds_total,
+        "wait_seconds_max": wait_stats.wait_seconds_max,
+        "connects": wait_stats.connects,
+        "connect_seconds_total": wait_stats.connect_seconds_total,
+        "connect_seconds_max": wait_stats.connect_seconds_max,
+    }
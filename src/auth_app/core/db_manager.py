@@ -2,28 +2,63 @@ from typing import Callable
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth_app.core.db import SessionLocal
+from auth_app.core.db import ReadSessionLocal, SessionLocal
+from auth_app.core.metrics import timed
 from auth_app.domain.repositories import AuthRepository, UserRepository
 
 
 class DBManager:
-    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal):
+    """Единица работы с БД. Сессии и репозитории создаются при первом обращении,
+    поэтому запрос, который до БД не дошёл, не трогает пул соединений."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        read_session_factory: Callable[[], AsyncSession] | None = ReadSessionLocal,
+    ):
         self.session_factory = session_factory
-        self.session: AsyncSession | None = None
-        self.users: UserRepository | None = None
-        self.auth: AuthRepository | None = None
+        self.read_session_factory = read_session_factory
+        self._session: AsyncSession | None = None
+        self._read_session: AsyncSession | None = None
+        self._users: UserRepository | None = None
+        self._auth: AuthRepository | None = None
 
     async def __aenter__(self) -> "DBManager":
-        self.session = self.session_factory()
-        self.users = UserRepository(self.session)
-        self.auth = AuthRepository(self.session)
         return self
 
     async def __aexit__(self, *args) -> None:
-        if self.session:
-            await self.session.rollback()
-            await self.session.close()
+        for session in (self._read_session, self._session):
+            if session is None:
+                continue
+            if session.in_transaction():
+                await session.rollback()
+            await session.close()
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self.session_factory()
+        return self._session
+
+    @property
+    def read_session(self) -> AsyncSession | None:
+        if self._read_session is None and self.read_session_factory is not None:
+            self._read_session = self.read_session_factory()
+        return self._read_session
+
+    @property
+    def users(self) -> UserRepository:
+        if self._users is None:
+            self._users = UserRepository(self.session, self.read_session)
+        return self._users
+
+    @property
+    def auth(self) -> AuthRepository:
+        if self._auth is None:
+            self._auth = AuthRepository(self.session, self.read_session)
+        return self._auth
 
+    @timed("db.commit")
     async def commit(self) -> None:
-        if self.session:
-            await self.session.commit()
+        if self._session is not None:
+            await self._session.commit()
@@ -24,3 +24,11 @@ class RefreshTokenNotFoundError(AppError):
 
 class RefreshTokenExpiredError(AppError):
     """Рефреш токен истёк."""
+
+
+class InvalidSessionCookieError(AppError):
+    """Кука сессии повреждена или подписана чужим ключом."""
+
+
+class PasswordHasherBusyError(AppError):
+    """Очередь хэширования паролей переполнена."""
@@ -0,0 +1,121 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+
+import jwt
+
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+    except (binascii.Error, ValueError) as err:
+        raise jwt.DecodeError("Invalid token padding") from err
+
+
+class PyJWTCodec:
+    """Кодек поверх общих jwt.encode / jwt.decode."""
+
+    def __init__(self, key: str, algorithm: str):
+        self.key = key
+        self.algorithm = algorithm
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(payload, self.key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(token, self.key, algorithms=[self.algorithm])
+
+
+class HMACCodec:
+    """Специализированный кодек для HS256/HS384/HS512.
+
+    Сегмент заголовка и HMAC-объект с ключом готовятся один раз, на каждый
+    токен остаются только сериализация payload и copy() подготовленного HMAC.
+    Формат совпадает с PyJWT байт в байт, проверки exp/nbf/iat — те же.
+    """
+
+    def __init__(self, key: str, algorithm: str):
+        self.algorithm = algorithm
+        header = json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True)
+        self._header_segment = _b64encode(header.encode("utf-8"))
+        self._mac = hmac.new(key.encode("utf-8"), digestmod=_HMAC_DIGESTS[algorithm])
+
+    def encode(self, payload: dict) -> str:
+        payload_segment = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        signing_input = self._header_segment + b"." + payload_segment
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode("ascii")
+
+    def decode(self, token: str) -> dict:
+        try:
+            signing_input, signature_segment = token.encode("ascii").rsplit(b".", 1)
+            header_segment, payload_segment = signing_input.split(b".")
+        except (UnicodeEncodeError, ValueError) as err:
+            raise jwt.DecodeError("Not enough segments") from err
+        if header_segment != self._header_segment:
+            self._check_header(header_segment)
+        if not hmac.compare_digest(self._sign(signing_input), _b64decode(signature_segment)):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+        try:
+            payload = json.loads(_b64decode(payload_segment))
+        except ValueError as err:
+            raise jwt.DecodeError(f"Invalid payload string: {err}") from err
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+        self._validate_claims(payload, time.time())
+        return payload
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def _check_header(self, header_segment: bytes) -> None:
+        """Медленный путь для заголовков, отличных от нашего (например, с kid)."""
+        try:
+            header = json.loads(_b64decode(header_segment))
+        except ValueError as err:
+            raise jwt.DecodeError(f"Invalid header string: {err}") from err
+        if not isinstance(header, dict):
+            raise jwt.DecodeError("Invalid header string: must be a json object")
+        if header.get("alg") != self.algorithm:
+            raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+
+    def _validate_claims(self, payload: dict, now: float) -> None:
+        if "iat" in payload:
+            try:
+                iat = int(payload["iat"])
+            except (TypeError, ValueError, OverflowError):
+                raise jwt.InvalidIssuedAtError("Issued At claim (iat) must be an integer.") from None
+            if iat > now:
+                raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+        if "nbf" in payload:
+            try:
+                nbf = int(payload["nbf"])
+            except (TypeError, ValueError, OverflowError):
+                raise jwt.DecodeError("Not Before claim (nbf) must be an integer.") from None
+            if nbf > now:
+                raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+        if "exp" in payload:
+            try:
+                exp = int(payload["exp"])
+            except (TypeError, ValueError, OverflowError):
+                raise jwt.DecodeError("Expiration Time claim (exp) must be an integer.") from None
+            if exp <= now:
+                raise jwt.ExpiredSignatureError("Signature has expired")
+
+
+def build_codec(key: str, algorithm: str, fast: bool = True) -> PyJWTCodec | HMACCodec:
+    """Выбирает специализированный кодек, если он есть для алгоритма."""
+    if fast and algorithm in _HMAC_DIGESTS:
+        return HMACCodec(key, algorithm)
+    return PyJWTCodec(key, algorithm)
@@ -0,0 +1,83 @@
+import hashlib
+import json
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jwt.algorithms import get_default_algorithms
+
+
+ASYMMETRIC_ALGORITHMS = {"EdDSA", "ES256"}
+
+
+class KeyRing:
+    """Набор асимметричных ключей из каталога: по файлу на kid.
+
+    `<kid>.pem` — приватный ключ (им можно подписывать), `<kid>.pub.pem` —
+    только публичный (выведенный из ротации ключ, нужен лишь для проверки
+    ещё живых токенов). Подписывает активный kid, проверка — любым известным.
+    """
+
+    def __init__(self, keys_dir: str, algorithm: str, active_kid: str | None = None):
+        self.algorithm = algorithm
+        self._private: dict[str, object] = {}
+        self._public: dict[str, object] = {}
+        self._load(Path(keys_dir))
+        if not self._private:
+            raise ValueError(f"No private keys found in {keys_dir}")
+        self.active_kid = active_kid or sorted(self._private)[-1]
+        if self.active_kid not in self._private:
+            raise ValueError(f"Active key {self.active_kid!r} not found in {keys_dir}")
+        self._jwks_body, self._jwks_etag = self._build_jwks()
+
+    def signing_key(self) -> tuple[str, object]:
+        return self.active_kid, self._private[self.active_kid]
+
+    def verification_key(self, kid: str | None) -> object:
+        key = self._public.get(kid) if kid else None
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return key
+
+    def jwks(self) -> tuple[bytes, str]:
+        """Готовый JSON документа JWKS и его ETag."""
+        return self._jwks_body, self._jwks_etag
+
+    def _load(self, keys_dir: Path) -> None:
+        for path in sorted(keys_dir.glob("*.pem")):
+            data = path.read_bytes()
+            if path.name.endswith(".pub.pem"):
+                kid = path.name.removesuffix(".pub.pem")
+                self._public[kid] = load_pem_public_key(data)
+            else:
+                kid = path.name.removesuffix(".pem")
+                private_key = load_pem_private_key(data, password=None)
+                self._private[kid] = private_key
+                self._public[kid] = private_key.public_key()
+
+    def _build_jwks(self) -> tuple[bytes, str]:
+        algorithm = get_default_algorithms()[self.algorithm]
+        keys = []
+        for kid, public_key in sorted(self._public.items()):
+            jwk = algorithm.to_jwk(public_key, as_dict=True)
+            jwk.update({"kid": kid, "alg": self.algorithm, "use": "sig"})
+            keys.append(jwk)
+        body = json.dumps({"keys": keys}, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class KeyRingCodec:
+    """Кодек для EdDSA/ES256: подпись активным ключом с kid, проверка по kid."""
+
+    def __init__(self, keyring: KeyRing):
+        self.keyring = keyring
+        self.algorithm = keyring.algorithm
+
+    def encode(self, payload: dict) -> str:
+        kid, private_key = self.keyring.signing_key()
+        return jwt.encode(payload, private_key, algorithm=self.algorithm, headers={"kid": kid})
+
+    def decode(self, token: str) -> dict:
+        header = jwt.get_unverified_header(token)
+        key = self.keyring.verification_key(header.get("kid"))
+        return jwt.decode(token, key, algorithms=[self.algorithm])
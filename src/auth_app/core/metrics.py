@@ -0,0 +1,185 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from auth_app.core.config import settings
+
+
+F = TypeVar("F", bound=Callable)
+C = TypeVar("C", bound=type)
+
+# границы корзин в секундах: от кэш-попаданий до bcrypt с высокой стоимостью
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20)
+
+
+class Histogram:
+    """Кумулятивная гистограмма в формате Prometheus по наборам меток."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # метки -> [счётчики по корзинам (+Inf последней), сумма]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            base = ",".join(f'{key}="{value}"' for key, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    """Замеры одного запроса: время по этапам и обращения к БД."""
+
+    __slots__ = ("stages", "db_round_trips", "db_seconds")
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self.db_round_trips = 0
+        self.db_seconds = 0.0
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing в миллисекундах."""
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        entries.append(f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_round_trips} round trips"')
+        return ", ".join(entries)
+
+
+stage_latency = Histogram(
+    "auth_stage_duration_seconds", "Latency of instrumented stages.", ("stage",), LATENCY_BUCKETS
+)
+request_latency = Histogram(
+    "auth_request_duration_seconds", "Latency of HTTP requests.", ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_round_trips = Histogram(
+    "auth_request_db_round_trips", "Database round trips per HTTP request.", ("method", "route"), ROUND_TRIP_BUCKETS
+)
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def begin_request() -> tuple[RequestMetrics, object]:
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token: object) -> None:
+    _current.reset(token)
+
+
+def observe(stage: str, seconds: float) -> None:
+    stage_latency.observe((stage,), seconds)
+    current = _current.get()
+    if current is not None:
+        # одноимённые этапы внутри запроса суммируются
+        current.stages[stage] = current.stages.get(stage, 0.0) + seconds
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """Декоратор замера этапа; при выключенных метриках возвращает функцию как есть."""
+
+    def decorator(fn: F) -> F:
+        if not settings.metrics_enabled:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    observe(stage, time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_methods(prefix: str) -> Callable[[C], C]:
+    """Оборачивает в timed все публичные корутины класса как этапы prefix.<метод>."""
+
+    def decorator(cls: C) -> C:
+        if not settings.metrics_enabled:
+            return cls
+        for name, member in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(member):
+                setattr(cls, name, timed(f"{prefix}.{name}")(member))
+        return cls
+
+    return decorator
+
+
+def instrument_engine(target: AsyncEngine) -> None:
+    """Считает обращения к БД и их время в текущем запросе."""
+    sync_engine = target.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        current = _current.get()
+        if current is not None:
+            current.db_round_trips += 1
+            current.db_seconds += elapsed
+
+
+def _render_counters(name: str, help_text: str, label: str, values: dict[str, float]) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    lines.extend(f'{name}{{{label}="{key}"}} {value}' for key, value in sorted(values.items()))
+    return lines
+
+
+def render_metrics(cache_stats: dict[str, dict]) -> str:
+    """Все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    for histogram in (request_latency, request_round_trips, stage_latency):
+        lines.extend(histogram.render())
+    for counter in ("hits", "misses", "evictions", "expirations"):
+        lines.extend(
+            _render_counters(
+                f"auth_cache_{counter}_total",
+                f"In-process cache {counter}.",
+                "cache",
+                {name: stats[counter] for name, stats in cache_stats.items()},
+            )
+        )
+    lines.append("# HELP auth_cache_size Entries in in-process caches.")
+    lines.append("# TYPE auth_cache_size gauge")
+    lines.extend(f'auth_cache_size{{cache="{name}"}} {stats["size"]}' for name, stats in sorted(cache_stats.items()))
+    return "\n".join(lines) + "\n"
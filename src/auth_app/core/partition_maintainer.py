@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from auth_app.core.config import settings
+from auth_app.core.db import engine
+from auth_app.core.partitions import create_partitions, expired_partitions, max_lifetimes, partition_state
+from auth_app.core.schema import SCHEMA_LOCK_KEY
+
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionMaintainer:
+    """Ведёт суточные секции sessions и refresh_tokens по created_at.
+
+    Создаёт секции на partition_days_ahead дней вперёд и удаляет секции,
+    все строки которых гарантированно истекли: отсоединение и DROP TABLE
+    вместо построчного DELETE, без мёртвых кортежей и нагрузки на vacuum.
+    Секция дня D удаляется, когда D + 1 день + максимальная жизнь строки + запас
+    остались в прошлом.
+    """
+
+    safety_margin = timedelta(days=1)
+    # сессионный advisory lock на удаление: DETACH ... CONCURRENTLY не работает в транзакции
+    drop_lock_key = SCHEMA_LOCK_KEY + 1
+
+    def __init__(self, target: AsyncEngine = engine):
+        self.target = target
+        self.created = 0
+        self.dropped = 0
+        self.drop_errors = 0
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self, now: datetime | None = None) -> dict[str, dict[str, list[str]]]:
+        now = now or datetime.now(timezone.utc)
+        report = {}
+        for table, lifetime in max_lifetimes().items():
+            async with self.target.begin() as conn:
+                # несколько воркеров не должны одновременно создавать одну секцию
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                created = await create_partitions(conn, table, now.date(), settings.partition_days_ahead)
+            dropped = await self._drop_expired(table, now - lifetime - self.safety_margin)
+            self.created += len(created)
+            report[table] = {"created": created, "dropped": dropped}
+        return report
+
+    def stats(self) -> dict:
+        return {"created": self.created, "dropped": self.dropped, "drop_errors": self.drop_errors}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _drop_expired(self, table: str, cutoff: datetime) -> list[str]:
+        """Удаляет истёкшие секции; занят лок — удаляет другой воркер, пропускаем проход."""
+        dropped = []
+        # DETACH ... CONCURRENTLY не держит ACCESS EXCLUSIVE на родителе, но не работает в транзакции
+        async with self.target.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.drop_lock_key}):
+                return dropped
+            try:
+                for name in await expired_partitions(conn, table, cutoff):
+                    try:
+                        if await self._drop_partition(conn, table, name):
+                            dropped.append(name)
+                    except Exception:
+                        self.drop_errors += 1
+                        logger.exception("Failed to drop partition %s", name)
+            finally:
+                try:
+                    await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.drop_lock_key})
+                except BaseException:
+                    # иначе соединение вернётся в пул с удерживаемым локом
+                    await conn.invalidate()
+                    raise
+        return dropped
+
+    async def _drop_partition(self, conn: AsyncConnection, table: str, name: str) -> bool:
+        # состояние перечитываем: секцию мог обработать другой воркер или прерванный прошлый проход
+        state = await partition_state(conn, name)
+        if state is None:
+            return False
+        if state == "attached":
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY"))
+        elif state == "detach_pending":
+            # прерванный DETACH ... CONCURRENTLY оставляет секцию в промежуточном состоянии
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} FINALIZE"))
+        await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        self.dropped += 1
+        return True
+
+    async def _run(self) -> None:
+        # первый проход сразу: init_db не трогает секции, если версия схемы актуальна
+        while True:
+            try:
+                report = await self.run_once()
+            except Exception:
+                logger.exception("Failed to maintain partitions")
+            else:
+                logger.info("Partition maintenance: %s", report)
+            await asyncio.sleep(settings.partition_maintenance_interval_seconds)
+
+
+partition_maintainer = PartitionMaintainer()
@@ -0,0 +1,95 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from auth_app.core.config import settings
+
+
+PARTITIONED_TABLES = ("sessions", "refresh_tokens")
+
+
+def max_lifetimes() -> dict[str, timedelta]:
+    """Сколько после created_at строка может оставаться живой."""
+    return {
+        # rolling-продление не выходит за абсолютный таймаут
+        "sessions": timedelta(days=settings.session_absolute_timeout_days),
+        "refresh_tokens": timedelta(minutes=settings.refresh_token_expires_minutes),
+    }
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> list[str]:
+    rows = await conn.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    return list(rows)
+
+
+async def create_partitions(conn: AsyncConnection, table: str, today: date, days_ahead: int) -> list[str]:
+    """Создаёт недостающие суточные секции на дни [today, today + days_ahead]."""
+    existing = set(await list_partitions(conn, table))
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = partition_name(table, day)
+        if name in existing:
+            continue
+        await conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{_day_start(day).isoformat()}') "
+                f"TO ('{_day_start(day + timedelta(days=1)).isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+async def list_partition_tables(conn: AsyncConnection, table: str) -> list[str]:
+    """Таблицы секций по имени, включая отсоединённые, но ещё не удалённые."""
+    rows = await conn.scalars(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relnamespace = CAST(current_schema() AS regnamespace) AND relkind IN ('r', 'p') "
+            "AND relname ~ :pattern"
+        ),
+        {"pattern": f"^{table}_p[0-9]{{8}}$"},
+    )
+    return list(rows)
+
+
+async def partition_state(conn: AsyncConnection, name: str) -> str | None:
+    """attached, detach_pending, detached или None, если таблицы уже нет."""
+    if await conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+        return None
+    pending = await conn.scalar(
+        text("SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = CAST(:name AS regclass)"),
+        {"name": name},
+    )
+    if pending is None:
+        return "detached"
+    return "detach_pending" if pending else "attached"
+
+
+async def expired_partitions(conn: AsyncConnection, table: str, cutoff: datetime) -> list[str]:
+    """Секции (в том числе недоудалённые), чей последний момент created_at раньше cutoff."""
+    expired = []
+    prefix = f"{table}_p"
+    for name in await list_partition_tables(conn, table):
+        day = datetime.strptime(name.removeprefix(prefix), "%Y%m%d").date()
+        if _day_start(day + timedelta(days=1)) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_app.core.db import SessionLocal
+from auth_app.core.exceptions import PasswordHasherBusyError
+from auth_app.core.security import security
+from auth_app.domain.repositories import UserRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordRehasher:
+    """Перехэширует пароли со стоимостью вне политики после успешного входа.
+
+    Работает в фоне, отдельной сессией БД: ответ на логин его не ждёт.
+    Хэш обновляется условным UPDATE по старому значению, так что смена
+    пароля, случившаяся тем временем, не затирается.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal):
+        self.session_factory = session_factory
+        self.rehashed = 0
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def schedule(self, user_id: int, password: str, old_hash: str) -> None:
+        if user_id in self._tasks:
+            return
+        task = asyncio.create_task(self._rehash(user_id, password, old_hash))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _rehash(self, user_id: int, password: str, old_hash: str) -> None:
+        try:
+            new_hash = await security.hash_password_async(password)
+            async with self.session_factory() as session:
+                if await UserRepository(session).update_password_hash(user_id, old_hash, new_hash):
+                    await session.commit()
+                    self.rehashed += 1
+        except PasswordHasherBusyError:
+            # пул занят запросами пользователей; перехэшируем при следующем входе
+            pass
+        except Exception:
+            logger.exception("Failed to rehash password for user %s", user_id)
+
+
+password_rehasher = PasswordRehasher()
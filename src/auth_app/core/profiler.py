@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from types import FrameType
+
+from auth_app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+# корневые кадры, разделяющие время на event loop и время ожидания (БД, пул bcrypt)
+ON_LOOP = "[on loop]"
+AWAITING = "[awaiting]"
+
+
+def _coroutine_frames(task: asyncio.Task) -> list[FrameType]:
+    """Логический стек задачи от корня к листу по цепочке cr_await."""
+    frames = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+def _thread_frames(leaf: FrameType | None) -> list[FrameType]:
+    frames = []
+    while leaf is not None:
+        frames.append(leaf)
+        leaf = leaf.f_back
+    frames.reverse()
+    return frames
+
+
+class Recording:
+    """Сэмплы одного запроса в формате speedscope."""
+
+    max_samples = 10_000
+
+    def __init__(self, task: asyncio.Task, name: str):
+        self.task = task
+        self.name = name
+        self.started_at = time.time()
+        self.frames: list[dict] = []
+        self._frame_index: dict[tuple, int] = {}
+        self.samples: list[list[int]] = []
+        self.weights: list[float] = []
+
+    def add_sample(self, frames: list[FrameType], state: str, weight_ms: float) -> None:
+        if len(self.samples) >= self.max_samples:
+            return
+        stack = [self._index(("", state, 0))]
+        stack.extend(
+            self._index((frame.f_code.co_filename, frame.f_code.co_qualname, frame.f_code.co_firstlineno))
+            for frame in frames
+        )
+        self.samples.append(stack)
+        self.weights.append(weight_ms)
+
+    def to_speedscope(self) -> dict:
+        total = sum(self.weights)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "exporter": settings.app_name,
+            "shared": {"frames": self.frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": total,
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+    def _index(self, key: tuple) -> int:
+        index = self._frame_index.get(key)
+        if index is None:
+            file, name, line = key
+            frame = {"name": name}
+            if file:
+                frame.update(file=file, line=line)
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append(frame)
+        return index
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер отдельных запросов.
+
+    Фоновый поток каждые profiler_interval_ms снимает логический стек каждой
+    профилируемой задачи. Если задача сейчас исполняется на event loop, к
+    стеку корутин добавляются синхронные кадры потока loop и сэмпл идёт под
+    корень [on loop]; иначе задача чего-то ждёт (ответа БД, пула bcrypt) и
+    сэмпл идёт под [awaiting] с тем await, на котором она стоит. Поток
+    работает, только пока есть активные записи.
+
+    Запрос профилируется по заголовку X-Profile с admin_token или,
+    после SIGUSR2, с вероятностью profiler_sample_rate в течение
+    profiler_signal_seconds; не больше profiler_max_per_minute записей
+    в минуту и profiler_max_concurrent одновременно.
+    """
+
+    header = b"x-profile"
+
+    def __init__(self) -> None:
+        self.recorded = 0
+        self.rate_limited = 0
+        self.armed_until = 0.0
+        self._started: deque[float] = deque()
+        self._active: dict[asyncio.Task, Recording] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._loop_thread_id: int | None = None
+
+    def arm(self, seconds: float | None = None) -> None:
+        """Включает выборочное профилирование на seconds секунд."""
+        seconds = settings.profiler_signal_seconds if seconds is None else seconds
+        self.armed_until = time.monotonic() + seconds
+        logger.warning("Profiler armed for %s s, sample rate %s", seconds, settings.profiler_sample_rate)
+
+    def install_signal_handler(self) -> None:
+        if hasattr(signal, "SIGUSR2"):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, self.arm)
+
+    def should_profile(self, headers: list[tuple[bytes, bytes]]) -> bool:
+        now = time.monotonic()
+        if not self._requested(headers, now):
+            return False
+        while self._started and now - self._started[0] >= 60:
+            self._started.popleft()
+        limited = len(self._active) >= settings.profiler_max_concurrent
+        if limited or len(self._started) >= settings.profiler_max_per_minute:
+            self.rate_limited += 1
+            return False
+        self._started.append(now)
+        return True
+
+    def begin(self, name: str) -> Recording:
+        task = asyncio.current_task()
+        recording = Recording(task, name)
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._active[task] = recording
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        return recording
+
+    async def finish(self, recording: Recording) -> Path:
+        with self._lock:
+            self._active.pop(recording.task, None)
+        self.recorded += 1
+        return await asyncio.to_thread(self._write, recording)
+
+    def stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "rate_limited": self.rate_limited,
+            "active": len(self._active),
+            "armed_seconds_left": max(0.0, self.armed_until - time.monotonic()),
+        }
+
+    def _requested(self, headers: list[tuple[bytes, bytes]], now: float) -> bool:
+        token = settings.admin_token
+        if token:
+            for key, value in headers:
+                if key == self.header:
+                    return secrets.compare_digest(value, token.encode("latin-1"))
+        return now < self.armed_until and random.random() < settings.profiler_sample_rate
+
+    def _sample_loop(self) -> None:
+        interval = settings.profiler_interval_ms / 1000
+        last = time.perf_counter()
+        while True:
+            # под локом: finish не должен забрать запись посреди сэмпла
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                # вес — фактический промежуток: sleep и GIL легко растягивают интервал
+                now = time.perf_counter()
+                weight_ms, last = (now - last) * 1000, now
+                loop_frames = _thread_frames(sys._current_frames().get(self._loop_thread_id))
+                for recording in self._active.values():
+                    self._sample(recording, loop_frames, weight_ms)
+            time.sleep(interval)
+
+    def _sample(self, recording: Recording, loop_frames: list[FrameType], weight_ms: float) -> None:
+        try:
+            frames = _coroutine_frames(recording.task)
+        except Exception:
+            # цепочку await меняет event loop, пока мы её читаем; сэмпл просто пропускаем
+            return
+        if not frames:
+            return
+        for position, frame in enumerate(loop_frames):
+            if frame is frames[-1]:
+                recording.add_sample(frames + loop_frames[position + 1 :], ON_LOOP, weight_ms)
+                return
+        recording.add_sample(frames, AWAITING, weight_ms)
+
+    def _write(self, recording: Recording) -> Path:
+        directory = Path(settings.profiler_output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(recording.started_at))
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", recording.name).strip("_")
+        path = directory / f"{stamp}-{os.getpid()}-{slug}.speedscope.json"
+        path.write_text(json.dumps(recording.to_speedscope()), encoding="utf-8")
+        return path
+
+
+profiler = SamplingProfiler()
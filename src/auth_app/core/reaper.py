@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import delete, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_app.core.config import settings
+from auth_app.core.db import SessionLocal
+from auth_app.domain.models import RefreshToken, RevokedToken, UserSession
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiredTokenReaper:
+    """Удаляет истёкшие сессии, refresh токены и записи отзыва небольшими пачками.
+
+    Идёт по индексу expires_at с keyset-курсором (expires_at, id), каждая
+    пачка — отдельная короткая транзакция с FOR UPDATE SKIP LOCKED, так что
+    несколько воркеров не мешают друг другу и запросам пользователей.
+    """
+
+    models = (UserSession, RefreshToken, RevokedToken)
+    # в секционированной схеме sessions и refresh_tokens чистятся удалением секций
+    partitioned_models = (RevokedToken,)
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal):
+        self.session_factory = session_factory
+        self.removed = {model.__tablename__: 0 for model in self.models}
+        self.runs = 0
+        self.last_run_seconds = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self, batch_size: int | None = None, sleep_ms: int | None = None) -> dict[str, int]:
+        """Один полный проход по всем таблицам; возвращает число удалённых строк."""
+        batch_size = batch_size or settings.reaper_batch_size
+        sleep_ms = settings.reaper_batch_sleep_ms if sleep_ms is None else sleep_ms
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        removed = {}
+        models = self.partitioned_models if settings.db_partitioned_tokens else self.models
+        for model in models:
+            removed[model.__tablename__] = await self._reap(model, now, batch_size, sleep_ms / 1000)
+            self.removed[model.__tablename__] += removed[model.__tablename__]
+        self.runs += 1
+        self.last_run_seconds = time.perf_counter() - started
+        return removed
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "last_run_seconds": self.last_run_seconds, "removed": dict(self.removed)}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reap(self, model, now: datetime, batch_size: int, sleep_seconds: float) -> int:
+        total = 0
+        cursor = None
+        while True:
+            candidates = select(model.id).where(model.expires_at <= now)
+            if cursor is not None:
+                last_expires_at, last_id = cursor
+                candidates = candidates.where(
+                    tuple_(model.expires_at, model.id)
+                    > tuple_(literal(last_expires_at, model.expires_at.type), literal(last_id, model.id.type))
+                )
+            candidates = (
+                candidates.order_by(model.expires_at, model.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            stmt = (
+                delete(model)
+                .where(model.id.in_(candidates.scalar_subquery()))
+                .returning(model.expires_at, model.id)
+                .execution_options(synchronize_session=False)
+            )
+            async with self.session_factory() as session:
+                rows = (await session.execute(stmt)).all()
+                await session.commit()
+            total += len(rows)
+            if len(rows) < batch_size:
+                return total
+            cursor = max(tuple(row) for row in rows)
+            await asyncio.sleep(sleep_seconds)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.reaper_interval_seconds)
+            try:
+                removed = await self.run_once()
+            except Exception:
+                logger.exception("Failed to reap expired tokens")
+            else:
+                logger.info("Reaped expired rows: %s", removed)
+
+
+reaper = ExpiredTokenReaper()
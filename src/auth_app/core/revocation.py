@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_app.core.bloom import BloomFilter
+from auth_app.core.config import settings
+from auth_app.core.db import SessionLocal
+from auth_app.core.db_manager import DBManager
+from auth_app.domain.models import RevokedToken
+
+
+logger = logging.getLogger(__name__)
+
+
+def user_revocation_key(user_id: int | str) -> str:
+    """Ключ записи «отозвать все access токены пользователя, выданные до revoked_at»."""
+    return f"user:{user_id}"
+
+
+class RevocationList:
+    """Список отозванных access JWT с фильтром Блума перед таблицей revoked_tokens.
+
+    Обычный запрос проверяет только фильтр в памяти; в БД идём лишь при
+    срабатывании фильтра. Фильтр периодически пересобирается из таблицы,
+    поэтому отзыв, сделанный другим воркером, виден не позже чем через
+    revocation_rebuild_interval_seconds.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal):
+        self.session_factory = session_factory
+        self._filter = BloomFilter(settings.revocation_bloom_capacity, settings.revocation_bloom_error_rate)
+        self._added_since_rebuild: list[str] = []
+        self.filter_hits = 0
+        self.db_checks = 0
+        self.revoked_hits = 0
+        self.last_rebuild_seconds = 0.0
+        self._task: asyncio.Task | None = None
+
+    def add(self, key: str) -> None:
+        """Сразу учитывает отзыв в фильтре этого воркера."""
+        self._filter.add(key)
+        self._added_since_rebuild.append(key)
+
+    def candidates(self, payload: dict) -> list[str]:
+        """Ключи токена, которые, возможно, отозваны (пусто на обычном пути)."""
+        keys = [user_revocation_key(payload["sub"])]
+        if payload.get("jti"):
+            keys.append(payload["jti"])
+        hits = [key for key in keys if key in self._filter]
+        if hits:
+            self.filter_hits += 1
+        return hits
+
+    async def is_revoked(self, db: DBManager, payload: dict) -> bool:
+        hits = self.candidates(payload)
+        if not hits:
+            return False
+        revocations = await db.auth.get_revocations(hits)
+        return self.matches(payload, revocations)
+
+    def matches(self, payload: dict, revocations: dict[str, RevokedToken]) -> bool:
+        """Сверяет токен с найденными в БД записями отзыва."""
+        self.db_checks += 1
+        revoked = payload.get("jti") in revocations
+        user_revocation = revocations.get(user_revocation_key(payload["sub"]))
+        # iat — время выдачи, округлённое вниз до секунды: токен из той же секунды,
+        # что и logout-all, мог быть выдан и до выхода, поэтому отзываем и его
+        if user_revocation is not None and payload["iat"] <= int(user_revocation.revoked_at.timestamp()):
+            revoked = True
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    async def rebuild(self) -> int:
+        """Собирает новый фильтр из живых записей таблицы и подменяет текущий."""
+        started = time.perf_counter()
+        self._added_since_rebuild = []
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            keys = list(await session.scalars(select(RevokedToken.jti).where(RevokedToken.expires_at > now)))
+        keys.extend(self._added_since_rebuild)
+        bloom = BloomFilter(
+            max(settings.revocation_bloom_capacity, len(keys) * 2), settings.revocation_bloom_error_rate
+        )
+        for key in keys:
+            bloom.add(key)
+        self._filter = bloom
+        self.last_rebuild_seconds = time.perf_counter() - started
+        return len(keys)
+
+    def stats(self) -> dict:
+        return {
+            "entries": self._filter.count,
+            "filter_hits": self.filter_hits,
+            "db_checks": self.db_checks,
+            "revoked_hits": self.revoked_hits,
+            "last_rebuild_seconds": self.last_rebuild_seconds,
+        }
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.rebuild()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.revocation_rebuild_interval_seconds)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Failed to rebuild the revocation filter")
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,69 @@
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from auth_app.core.config import settings
+from auth_app.core.partitions import PARTITIONED_TABLES, create_partitions
+from auth_app.domain.models import Base
+
+
+logger = logging.getLogger(__name__)
+
+# ключ pg_advisory_xact_lock, под которым схему меняет ровно один воркер
+SCHEMA_LOCK_KEY = 0x61757468
+
+
+async def _baseline(conn: AsyncConnection) -> None:
+    """Все таблицы текущих моделей; существующие не трогает."""
+    await conn.run_sync(Base.metadata.create_all)
+    # базы, созданные до появления cookie-сессий
+    await conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS session_epoch integer NOT NULL DEFAULT 0"))
+    if settings.db_partitioned_tokens:
+        today = datetime.now(timezone.utc).date()
+        for table in PARTITIONED_TABLES:
+            await create_partitions(conn, table, today, settings.partition_days_ahead)
+
+
+# (версия, шаг); новые шаги только дописываются в конец
+MIGRATIONS: list[tuple[int, Callable[[AsyncConnection], Awaitable[None]]]] = [
+    (1, _baseline),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def current_version(target: AsyncEngine) -> int:
+    """Версия схемы одним запросом; 0, если таблицы версий ещё нет."""
+    try:
+        async with target.connect() as conn:
+            return await conn.scalar(text("SELECT version FROM schema_version")) or 0
+    except DBAPIError:
+        return 0
+
+
+async def ensure_schema(target: AsyncEngine) -> int:
+    """Применяет недостающие миграции, ничего не удаляя.
+
+    Быстрый путь — один SELECT версии. Иначе воркер берёт транзакционный
+    advisory lock, перечитывает версию (её мог уже поднять другой воркер) и
+    применяет оставшиеся шаги в той же транзакции; остальные ждут на локе и
+    выходят, увидев актуальную версию. Возвращает число применённых шагов.
+    """
+    if await current_version(target) >= SCHEMA_VERSION:
+        return 0
+    async with target.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version integer NOT NULL)"))
+        version = await conn.scalar(text("SELECT version FROM schema_version"))
+        if version is None:
+            await conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+            version = 0
+        pending = [(step_version, step) for step_version, step in MIGRATIONS if step_version > version]
+        for step_version, step in pending:
+            logger.info("Applying schema migration %s", step_version)
+            await step(conn)
+            await conn.execute(text("UPDATE schema_version SET version = :version"), {"version": step_version})
+    return len(pending)
@@ -1,18 +1,143 @@
+import asyncio
 import hashlib
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 import bcrypt
 
+from auth_app.core.config import settings
+from auth_app.core.exceptions import PasswordHasherBusyError
+from auth_app.core.metrics import timed
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def _bcrypt_hash(digest: bytes, rounds: int = DEFAULT_BCRYPT_ROUNDS) -> str:
+    """Считает bcrypt-хэш; вынесено на уровень модуля, чтобы работать в пуле процессов."""
+    return bcrypt.hashpw(digest, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _bcrypt_check(digest: bytes, password_hash: bytes) -> bool:
+    """Сверяет прехэш с bcrypt-хэшем; вынесено на уровень модуля для пула процессов."""
+    return bcrypt.checkpw(digest, password_hash)
+
+
+def bcrypt_rounds_of(password_hash: str) -> int | None:
+    """Стоимость из хэша вида $2b$12$...; None для нераспознанного формата."""
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def measure_bcrypt_verify(rounds: int, repeat: int = 3) -> float:
+    """Лучшее из repeat время одной проверки bcrypt с данной стоимостью, в секундах."""
+    digest = hashlib.sha256(b"calibration").digest()
+    password_hash = bcrypt.hashpw(digest, bcrypt.gensalt(rounds))
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        bcrypt.checkpw(digest, password_hash)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    """Наибольшая стоимость, при которой проверка на этой машине укладывается в target_ms.
+
+    Каждый шаг стоимости удваивает время, поэтому перебор останавливается на
+    первой стоимости дороже цели; меньше min_rounds не опускаемся.
+    """
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        if measure_bcrypt_verify(rounds) * 1000 > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
 
 class Security:
-    def hash_password(self, password: str) -> str:
+    def __init__(self) -> None:
+        self._executor: Executor | None = None
+        self._pending = 0
+        self._calibrated_rounds: int | None = None
+
+    @property
+    def rounds(self) -> int:
+        """Стоимость bcrypt для новых хэшей: из настроек, из калибровки или по умолчанию."""
+        return settings.bcrypt_rounds or self._calibrated_rounds or DEFAULT_BCRYPT_ROUNDS
+
+    def calibrate(self) -> int:
+        """Подбирает стоимость под bcrypt_target_verify_ms (если задано и не указан bcrypt_rounds)."""
+        if settings.bcrypt_rounds is None and settings.bcrypt_target_verify_ms is not None:
+            self._calibrated_rounds = calibrate_bcrypt_rounds(
+                settings.bcrypt_target_verify_ms, settings.bcrypt_min_rounds, settings.bcrypt_max_rounds
+            )
+            logger.info(
+                "Calibrated bcrypt cost %s for %s ms verify target",
+                self._calibrated_rounds,
+                settings.bcrypt_target_verify_ms,
+            )
+        return self.rounds
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Стоимость сохранённого хэша ниже текущей политики (или формат не распознан).
+
+        Более дорогие хэши не трогаем: калибровка в разных воркерах может дать
+        соседние стоимости, и сравнение на неравенство гоняло бы хэш туда-сюда.
+        """
+        rounds = bcrypt_rounds_of(password_hash)
+        return rounds is None or rounds < self.rounds
+
+    def hash_password(self, password: str, rounds: int | None = None) -> str:
         """Хэширует пароль через bcrypt с предварительным SHA-256 прехэшем."""
-        digest = self._password_digest(password)
-        return bcrypt.hashpw(digest, bcrypt.gensalt()).decode("utf-8")
+        return _bcrypt_hash(self._password_digest(password), rounds or self.rounds)
 
     def verify_password(self, password: str, password_hash: str) -> bool:
         """Проверяет пароль, сравнивая его хэш с сохранённым bcrypt-хэшем."""
-        digest = self._password_digest(password)
-        return bcrypt.checkpw(digest, password_hash.encode("utf-8"))
+        return _bcrypt_check(self._password_digest(password), password_hash.encode("utf-8"))
+
+    @timed("security.hash_password")
+    async def hash_password_async(self, password: str) -> str:
+        """То же, что hash_password, но в пуле воркеров, не блокируя event loop."""
+        # стоимость передаём явно: в дочернем процессе калибровки нет
+        return await self._run(_bcrypt_hash, self._password_digest(password), self.rounds)
+
+    @timed("security.verify_password")
+    async def verify_password_async(self, password: str, password_hash: str) -> bool:
+        """То же, что verify_password, но в пуле воркеров, не блокируя event loop."""
+        return await self._run(_bcrypt_check, self._password_digest(password), password_hash.encode("utf-8"))
+
+    def shutdown(self) -> None:
+        """Останавливает пул воркеров (вызывается при остановке приложения)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        """Отправляет задачу в пул; при переполненной очереди сразу отказывает."""
+        if self._pending >= settings.password_hash_max_pending:
+            raise PasswordHasherBusyError
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    def _get_executor(self) -> Executor:
+        """Лениво создаёт пул потоков или процессов согласно настройкам."""
+        if self._executor is None:
+            workers = settings.password_hash_workers
+            if settings.password_hash_executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        return self._executor
 
     def _password_digest(self, password: str) -> bytes:
         """SHA-256 прехэш для устранения ограничения длины пароля в bcrypt."""
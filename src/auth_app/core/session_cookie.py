@@ -0,0 +1,83 @@
+import base64
+import binascii
+import hashlib
+import os
+import struct
+from datetime import datetime
+from typing import NamedTuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from auth_app.core.config import settings
+from auth_app.core.exceptions import InvalidSessionCookieError
+
+
+_VERSION = b"\x01"
+_ASSOCIATED_DATA = b"auth_app.session_cookie.v1"
+_NONCE_SIZE = 12
+# user_id, epoch, issued_at, expires_at, absolute_expires_at
+_PAYLOAD = struct.Struct(">QIIII")
+
+
+class SessionCookie(NamedTuple):
+    user_id: int
+    epoch: int
+    issued_at: int
+    expires_at: int
+    absolute_expires_at: int
+
+
+class SessionCookieHelper:
+    """Stateless-сессии: всё состояние лежит в зашифрованной (AES-GCM) куке.
+
+    Кука несёт user_id, эпоху отзыва пользователя, время выдачи, текущий
+    срок и абсолютный дедлайн; подделать или прочитать её без ключа нельзя.
+    """
+
+    def __init__(self) -> None:
+        self._aead: AESGCM | None = None
+        self._key_config: tuple | None = None
+
+    def issue(
+        self, user_id: int, epoch: int, issued_at: datetime, expires_at: datetime, absolute_expires_at: datetime
+    ) -> str:
+        payload = _PAYLOAD.pack(
+            user_id,
+            epoch,
+            int(issued_at.timestamp()),
+            int(expires_at.timestamp()),
+            int(absolute_expires_at.timestamp()),
+        )
+        nonce = os.urandom(_NONCE_SIZE)
+        sealed = self._get_aead().encrypt(nonce, payload, _ASSOCIATED_DATA)
+        return base64.urlsafe_b64encode(_VERSION + nonce + sealed).rstrip(b"=").decode("ascii")
+
+    def decode(self, token: str) -> SessionCookie:
+        """Расшифровывает куку; сроки не проверяет — это делает вызывающий код."""
+        try:
+            raw = base64.urlsafe_b64decode(token.encode("ascii") + b"=" * (-len(token) % 4))
+        except (UnicodeEncodeError, binascii.Error, ValueError) as err:
+            raise InvalidSessionCookieError from err
+        if raw[:1] != _VERSION:
+            raise InvalidSessionCookieError
+        nonce, sealed = raw[1 : 1 + _NONCE_SIZE], raw[1 + _NONCE_SIZE :]
+        try:
+            payload = self._get_aead().decrypt(nonce, sealed, _ASSOCIATED_DATA)
+        except (InvalidTag, ValueError) as err:
+            raise InvalidSessionCookieError from err
+        if len(payload) != _PAYLOAD.size:
+            raise InvalidSessionCookieError
+        return SessionCookie(*_PAYLOAD.unpack(payload))
+
+    def _get_aead(self) -> AESGCM:
+        """AEAD под текущий ключ; без SESSION_COOKIE_KEY ключ выводится из JWT_SECRET_KEY."""
+        config = (settings.session_cookie_key, settings.jwt_secret_key)
+        if self._aead is None or self._key_config != config:
+            secret = settings.session_cookie_key or f"session-cookie:{settings.jwt_secret_key}"
+            self._aead = AESGCM(hashlib.sha256(secret.encode("utf-8")).digest())
+            self._key_config = config
+        return self._aead
+
+
+session_cookies = SessionCookieHelper()
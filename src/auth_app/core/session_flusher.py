@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_app.core.config import settings
+from auth_app.core.db import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+_BATCH_UPDATE = text(
+    """
+    UPDATE sessions AS s
+    SET expires_at = GREATEST(s.expires_at, v.expires_at),
+        last_refreshed_at = GREATEST(s.last_refreshed_at, v.last_refreshed_at)
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:expires AS timestamptz[]), CAST(:refreshed AS timestamptz[]))
+        AS v(id, expires_at, last_refreshed_at)
+    WHERE s.id = v.id
+    """
+).bindparams(bindparam("ids"), bindparam("expires"), bindparam("refreshed"))
+
+
+class SessionExtensionFlusher:
+    """Копит rolling-продления сессий в памяти и пишет их в БД одним UPDATE."""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal):
+        self.session_factory = session_factory
+        self._pending: dict[UUID, tuple[datetime, datetime]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.flushed_rows = 0
+        self.flushes = 0
+
+    def record(self, session_id: UUID, expires_at: datetime, last_refreshed_at: datetime) -> None:
+        """Запоминает новый срок сессии; запрос не ждёт записи в БД."""
+        self._pending[session_id] = (expires_at, last_refreshed_at)
+        if len(self._pending) >= settings.session_flush_max_batch:
+            self._wakeup.set()
+
+    def pending(self, session_id: UUID) -> tuple[datetime, datetime] | None:
+        """Ещё не записанные (expires_at, last_refreshed_at) для сессии."""
+        return self._pending.get(session_id)
+
+    def discard(self, session_id: UUID) -> None:
+        """Забывает продление удалённой сессии."""
+        self._pending.pop(session_id, None)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и дописывает всё накопленное."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # ошибка последней записи не должна прерывать остальное завершение приложения
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to flush %d session extensions on shutdown", len(self._pending))
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        params = {
+            "ids": list(batch),
+            "expires": [expires_at for expires_at, _ in batch.values()],
+            "refreshed": [refreshed_at for _, refreshed_at in batch.values()],
+        }
+        try:
+            async with self.session_factory() as session:
+                await session.execute(_BATCH_UPDATE, params)
+                await session.commit()
+        except Exception:
+            for session_id, values in batch.items():
+                self._pending.setdefault(session_id, values)
+            raise
+        self.flushes += 1
+        self.flushed_rows += len(batch)
+
+    async def _run(self) -> None:
+        interval = settings.session_flush_interval_ms / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush session extensions")
+
+
+session_flusher = SessionExtensionFlusher()
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+_registry: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight(Generic[T]):
+    """Склеивает одновременные вызовы с одним ключом в один.
+
+    Первый вызов (лидер) выполняет работу, остальные ждут его результат или
+    получают то же исключение. Если лидера отменили, ожидающие выполняют
+    работу сами, а не падают вслед за ним.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+        _registry[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            return await self.do(key, fn)
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            # исключение лидер пробросит сам; ожидающих может и не быть
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "calls": self.calls, "shared": self.shared}
+
+
+def singleflight_stats() -> dict[str, dict]:
+    """Статистика всех групп по имени."""
+    return {name: group.stats() for name, group in _registry.items()}
+
+
+refresh_flight: SingleFlight = SingleFlight("token_refresh")
+session_flight: SingleFlight = SingleFlight("session_lookup")
@@ -0,0 +1,54 @@
+import time
+from typing import Hashable
+
+
+class HashedTimingWheel:
+    """Хэшированное колесо таймеров: O(1) на постановку, O(записей в слоте) на тик.
+
+    Ключ кладётся в слот `тик_дедлайна % slots`; записи с дедлайном дальше
+    одного оборота лежат в том же слоте и ждут своего круга. Колесо не
+    удаляет записи при продлении: владелец сам проверяет, действительно ли
+    ключ истёк, когда тот «выпадает» из advance().
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 512):
+        self.tick_seconds = tick_seconds
+        self._slots: list[list[tuple[int, Hashable]]] = [[] for _ in range(slots)]
+        self._current_tick = self._tick(time.time())
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Планирует ключ на unix-время deadline."""
+        tick = max(self._tick(deadline), self._current_tick + 1)
+        self._slots[tick % len(self._slots)].append((tick, key))
+        self._size += 1
+
+    def advance(self, now: float) -> list[Hashable]:
+        """Прокручивает колесо до now и возвращает ключи, чей дедлайн наступил."""
+        target = self._tick(now)
+        if target <= self._current_tick:
+            return []
+        due: list[Hashable] = []
+        slots_count = len(self._slots)
+        steps = min(target - self._current_tick, slots_count)
+        for step in range(1, steps + 1):
+            index = (self._current_tick + step) % slots_count
+            slot = self._slots[index]
+            if not slot:
+                continue
+            pending = []
+            for entry in slot:
+                if entry[0] <= target:
+                    due.append(entry[1])
+                else:
+                    pending.append(entry)
+            self._slots[index] = pending
+        self._size -= len(due)
+        self._current_tick = target
+        return due
+
+    def _tick(self, timestamp: float) -> int:
+        return int(timestamp // self.tick_seconds)
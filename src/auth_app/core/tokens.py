@@ -1,48 +1,113 @@
 import hashlib
 import secrets
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import datetime
 
 import jwt
 
+from auth_app.core.cache import token_cache
 from auth_app.core.config import settings
+from auth_app.core.jwt_codec import HMACCodec, PyJWTCodec, build_codec
+from auth_app.core.keys import ASYMMETRIC_ALGORITHMS, KeyRing, KeyRingCodec
+from auth_app.core.metrics import timed
+
+
+_EMPTY_JWKS = (b'{"keys":[]}', '"empty"')
 
 
 class TokenHelper:
-    def generate_session_token(self) -> tuple[str, str]:
+    def __init__(self) -> None:
+        self._codec: PyJWTCodec | HMACCodec | KeyRingCodec | None = None
+        self._codec_config: tuple | None = None
+
+    def generate_session_token(self) -> tuple[str, bytes]:
         """Создает сессионный токен и возвращает пару (сырой, хэш)."""
         token = secrets.token_urlsafe(32)
         return token, self.hash_session_token(token)
 
-    def hash_session_token(self, token: str) -> str:
-        """Хэширует сессионный токен через SHA-256."""
-        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    def hash_session_token(self, token: str) -> bytes:
+        """Хэширует сессионный токен через SHA-256; в БД хранится 32-байтный дайджест."""
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    @timed("tokens.create_access_token")
+    def create_access_token(
+        self, user_id: int, name: str | None = None, created_at: datetime | None = None
+    ) -> str:
+        """Формирует JWT access c типом access и истечением из настроек.
 
-    def create_access_token(self, user_id: int) -> str:
-        """Формирует JWT access c типом access и истечением из настроек."""
-        return self._create_token(user_id, "access", settings.access_token_expires_minutes)
+        При включённом jwt_embed_user_claims кладёт в токен name и created_at,
+        чтобы профиль собирался из payload без запроса к БД.
+        """
+        claims = None
+        if settings.jwt_embed_user_claims and name is not None and created_at is not None:
+            claims = {"name": name, "created_at": created_at.isoformat()}
+        return self._create_token(user_id, "access", settings.access_token_expires_minutes, claims)
 
     def create_refresh_token(self) -> str:
         """Создает долгоживущий случайный refresh токен (не JWT)."""
         return secrets.token_urlsafe(48)
 
+    @timed("tokens.decode_token")
     def decode_token(self, token: str, expected_type: str) -> dict:
-        """Декодирует JWT и проверяет совпадение типа."""
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        """Декодирует JWT и проверяет совпадение типа.
+
+        Проверенные payload кэшируются по дайджесту токена до его exp; ключ
+        включает конфигурацию ключей, поэтому после ротации старые записи
+        не находятся.
+        """
+        codec = self._get_codec()
+        cache_key = (self._codec_config, hashlib.sha256(token.encode("utf-8")).digest())
+        payload = token_cache.get(cache_key)
+        if payload is None:
+            payload = codec.decode(token)
+            token_cache.set(cache_key, payload, expires_at=payload.get("exp"))
         if payload.get("type") != expected_type:
             raise jwt.InvalidTokenError("Invalid token type")
-        return payload
+        return dict(payload)
 
-    def _create_token(self, user_id: int, token_type: str, expires_minutes: int) -> str:
-        """Собирает JWT с указанным типом и временем жизни."""
-        now = datetime.now(timezone.utc)
+    def _create_token(
+        self, user_id: int, token_type: str, expires_minutes: int, claims: dict | None = None
+    ) -> str:
+        """Собирает JWT с указанным типом, временем жизни и дополнительными claims."""
+        now = int(time.time())
         payload = {
             "sub": str(user_id),
             "type": token_type,
-            "iat": int(now.timestamp()),
-            "exp": int((now + timedelta(minutes=expires_minutes)).timestamp()),
+            "iat": now,
+            "exp": now + expires_minutes * 60,
             "iss": settings.app_name,
+            "jti": secrets.token_urlsafe(16),
         }
-        return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+        if claims:
+            payload.update(claims)
+        return self._get_codec().encode(payload)
+
+    def jwks(self) -> tuple[bytes, str]:
+        """Документ JWKS с публичными ключами и его ETag (пустой для HS*)."""
+        codec = self._get_codec()
+        if isinstance(codec, KeyRingCodec):
+            return codec.keyring.jwks()
+        return _EMPTY_JWKS
+
+    def _get_codec(self) -> PyJWTCodec | HMACCodec | KeyRingCodec:
+        """Кодек под текущие ключи и алгоритм; пересобирается при их смене."""
+        config = (
+            settings.jwt_secret_key,
+            settings.jwt_algorithm,
+            settings.jwt_fast_codec,
+            settings.jwt_keys_dir,
+            settings.jwt_active_kid,
+        )
+        if self._codec is None or self._codec_config != config:
+            if settings.jwt_algorithm in ASYMMETRIC_ALGORITHMS:
+                if not settings.jwt_keys_dir:
+                    raise ValueError(f"JWT_KEYS_DIR is required for {settings.jwt_algorithm}")
+                keyring = KeyRing(settings.jwt_keys_dir, settings.jwt_algorithm, settings.jwt_active_kid)
+                self._codec = KeyRingCodec(keyring)
+            else:
+                self._codec = build_codec(settings.jwt_secret_key, settings.jwt_algorithm, settings.jwt_fast_codec)
+            self._codec_config = config
+        return self._codec
 
 
 tokens = TokenHelper()
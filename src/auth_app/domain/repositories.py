@@ -1,53 +1,242 @@
 from datetime import datetime
-from typing import Optional
+from typing import NamedTuple, Optional
+from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import any_, bindparam, delete, false, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth_app.domain.models import RefreshToken, User, UserSession
+from auth_app.core.metrics import timed_methods
+from auth_app.domain.models import RefreshToken, RevokedToken, User, UserSession
 
 
-class UserRepository:
-    def __init__(self, session: AsyncSession):
+class RotatedRefreshToken(NamedTuple):
+    user_id: int
+    expires_at: datetime
+    user_name: str | None
+    user_created_at: datetime | None
+
+
+class BaseRepository:
+    """Пишет в основную сессию, читает из реплики (если она задана).
+
+    После первой записи в единице работы все чтения идут в основную БД,
+    чтобы видеть свои же изменения. Промах на реплике перепроверяется на
+    основной БД: строка могла ещё не доехать до реплики. Проверки, от
+    которых зависит доступ (сессии, эпохи, отзывы), реплику не используют.
+    """
+
+    def __init__(self, session: AsyncSession, read_session: AsyncSession | None = None):
         self.session = session
+        self.read_session = read_session
+
+    @property
+    def reader(self) -> AsyncSession:
+        if self.read_session is None or self.session.info.get("wrote"):
+            return self.session
+        return self.read_session
+
+    @property
+    def writer(self) -> AsyncSession:
+        self.session.info["wrote"] = True
+        return self.session
 
+    async def _read_scalar(self, stmt):
+        reader = self.reader
+        result = await reader.scalar(stmt)
+        if result is None and reader is not self.session:
+            result = await self.session.scalar(stmt)
+        return result
+
+    async def _read_many(self, column, keys: list) -> dict:
+        """Загружает строки по списку ключей одним WHERE column = ANY(...);
+        не найденные на реплике ключи дочитываются с основной БД."""
+        entity = column.class_
+        stmt = select(entity).where(column == any_(bindparam("keys", type_=ARRAY(column.type))))
+        reader = self.reader
+        found = {getattr(row, column.key): row for row in await reader.scalars(stmt, {"keys": keys})}
+        missing = [key for key in keys if key not in found]
+        if missing and reader is not self.session:
+            rows = await self.session.scalars(stmt, {"keys": missing})
+            found.update((getattr(row, column.key), row) for row in rows)
+        return found
+
+
+@timed_methods("users")
+class UserRepository(BaseRepository):
     async def get_user_by_name(self, name: str) -> Optional[User]:
-        return await self.session.scalar(select(User).where(User.name == name))
+        return await self._read_scalar(select(User).where(User.name == name))
 
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
-        return await self.session.get(User, user_id)
+        return await self._read_scalar(select(User).where(User.id == user_id))
 
-    async def create_user(self, name: str, password_hash: str) -> User:
-        user = User(name=name, password_hash=password_hash)
-        self.session.add(user)
-        await self.session.flush()
-        return user
+    async def get_users_by_ids(self, user_ids: list[int]) -> dict[int, User]:
+        """Загружает пользователей одним запросом WHERE id = ANY(...)."""
+        return await self._read_many(User.id, user_ids)
 
+    async def get_session_epoch(self, user_id: int) -> Optional[int]:
+        """Текущая эпоха отзыва cookie-сессий; читается с основной БД, чтобы
+        отставание реплики не продлевало жизнь отозванным кукам."""
+        return await self.session.scalar(select(User.session_epoch).where(User.id == user_id))
 
-class AuthRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
+    async def get_session_epochs(self, user_ids: list[int]) -> dict[int, int]:
+        """То же для пачки пользователей одним запросом, тоже с основной БД."""
+        stmt = select(User.id, User.session_epoch).where(
+            User.id == any_(bindparam("ids", type_=ARRAY(User.id.type)))
+        )
+        return dict((await self.session.execute(stmt, {"ids": user_ids})).tuples().all())
 
-    async def create_session(self, user_id: int, token_hash: str, expires_at: datetime) -> UserSession:
-        record = UserSession(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
-        self.session.add(record)
+    async def bump_session_epoch(self, user_id: int) -> Optional[int]:
+        """Увеличивает эпоху, отзывая все выданные пользователю cookie-сессии."""
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(session_epoch=User.session_epoch + 1)
+            .returning(User.session_epoch)
+            .execution_options(synchronize_session=False)
+        )
+        return await self.writer.scalar(stmt)
+
+    async def update_password_hash(self, user_id: int, old_hash: str, new_hash: str) -> bool:
+        """Меняет хэш, только если он всё ещё равен old_hash."""
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        return await self.writer.scalar(stmt) is not None
+
+    async def create_user(self, name: str, password_hash: str) -> Optional[User]:
+        """INSERT ... ON CONFLICT (name) DO NOTHING RETURNING; None, если имя занято."""
+        users = await self.create_users([(name, password_hash)])
+        return users[0] if users else None
+
+    async def create_users(self, rows: list[tuple[str, str]]) -> list[User]:
+        """Вставляет пачку (name, password_hash) одним запросом, пропуская занятые имена.
+
+        Возвращает только созданных пользователей.
+        """
+        if not rows:
+            return []
+        stmt = (
+            pg_insert(User)
+            .values([{"name": name, "password_hash": password_hash} for name, password_hash in rows])
+            .on_conflict_do_nothing(index_elements=[User.name])
+            .returning(User)
+        )
+        return list(await self.writer.scalars(stmt))
+
+
+@timed_methods("auth")
+class AuthRepository(BaseRepository):
+    async def create_session(
+        self, user_id: int, token_hash: bytes, expires_at: datetime, created_at: datetime
+    ) -> UserSession:
+        record = UserSession(
+            user_id=user_id,
+            token_hash=token_hash,
+            expires_at=expires_at,
+            created_at=created_at,
+            last_refreshed_at=created_at,
+        )
+        self.writer.add(record)
         await self.session.flush()
         return record
 
-    async def get_session_by_hash(self, token_hash: str) -> Optional[UserSession]:
+    async def get_session_by_hash(self, token_hash: bytes) -> Optional[UserSession]:
+        """Сессия по хэшу токена; только с основной БД: реплика, отстающая
+        от logout, ещё найдёт удалённую сессию и пустит по ней."""
         return await self.session.scalar(select(UserSession).where(UserSession.token_hash == token_hash))
 
-    async def delete_session(self, session_obj: UserSession) -> None:
-        await self.session.delete(session_obj)
+    async def get_sessions_by_hashes(self, token_hashes: list[bytes]) -> dict[bytes, UserSession]:
+        """Загружает сессии одним запросом WHERE token_hash = ANY(...), тоже с основной БД."""
+        stmt = select(UserSession).where(
+            UserSession.token_hash == any_(bindparam("keys", type_=ARRAY(UserSession.token_hash.type)))
+        )
+        return {row.token_hash: row for row in await self.session.scalars(stmt, {"keys": token_hashes})}
 
-    async def create_refresh_token(self, user_id: int, token_hash: str, expires_at: datetime) -> RefreshToken:
+    async def delete_session_by_hash(self, token_hash: bytes) -> Optional[UUID]:
+        """Удаляет сессию одним DELETE ... RETURNING id, без предварительного SELECT."""
+        stmt = delete(UserSession).where(UserSession.token_hash == token_hash).returning(UserSession.id)
+        return await self.writer.scalar(stmt)
+
+    async def create_refresh_token(self, user_id: int, token_hash: bytes, expires_at: datetime) -> RefreshToken:
         token = RefreshToken(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
-        self.session.add(token)
+        self.writer.add(token)
         await self.session.flush()
         return token
 
-    async def get_refresh_token(self, token_hash: str) -> Optional[RefreshToken]:
-        return await self.session.scalar(select(RefreshToken).where(RefreshToken.token_hash == token_hash))
+    async def delete_refresh_token_by_hash(self, token_hash: bytes) -> bool:
+        stmt = delete(RefreshToken).where(RefreshToken.token_hash == token_hash).returning(RefreshToken.id)
+        return await self.writer.scalar(stmt) is not None
+
+    async def revoke_refresh_tokens(self, user_id: int) -> int:
+        """Отзывает все refresh токены пользователя одним UPDATE."""
+        stmt = (
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False))
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.writer.execute(stmt)
+        return result.rowcount
+
+    async def revoke_access_token(self, jti: str, user_id: int, revoked_at: datetime, expires_at: datetime) -> None:
+        """Записывает отзыв; повторный отзыв того же ключа сдвигает revoked_at и срок."""
+        stmt = pg_insert(RevokedToken).values(
+            jti=jti, user_id=user_id, revoked_at=revoked_at, expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RevokedToken.jti],
+            set_={"revoked_at": stmt.excluded.revoked_at, "expires_at": stmt.excluded.expires_at},
+        )
+        await self.writer.execute(stmt)
+
+    async def get_revocations(self, keys: list[str]) -> dict[str, RevokedToken]:
+        """Записи отзыва по ключам; только с основной БД — реплика может отставать."""
+        stmt = select(RevokedToken).where(
+            RevokedToken.jti == any_(bindparam("keys", type_=ARRAY(RevokedToken.jti.type)))
+        )
+        return {row.jti: row for row in await self.session.scalars(stmt, {"keys": keys})}
+
+    async def rotate_refresh_token(
+        self, token_hash: bytes, new_token_hash: bytes, new_expires_at: datetime, now: datetime
+    ) -> Optional[RotatedRefreshToken]:
+        """Атомарно гасит refresh токен и выдаёт новый одним запросом.
 
-    async def delete_refresh_token(self, token_obj: RefreshToken) -> None:
-        await self.session.delete(token_obj)
+        DELETE ... RETURNING удаляет старый токен (в том числе истёкший), INSERT
+        создаёт новый только для живого токена существующего пользователя.
+        Из двух параллельных ротаций одного токена строку получит только одна.
+        """
+        old = (
+            delete(RefreshToken)
+            .where(RefreshToken.token_hash == token_hash, RefreshToken.revoked.is_(False))
+            .returning(RefreshToken.user_id, RefreshToken.expires_at)
+            .cte("old")
+        )
+        inserted = (
+            insert(RefreshToken)
+            .from_select(
+                ["user_id", "token_hash", "expires_at", "revoked"],
+                select(
+                    old.c.user_id,
+                    literal(new_token_hash, RefreshToken.token_hash.type),
+                    literal(new_expires_at, RefreshToken.expires_at.type),
+                    false(),
+                )
+                .join_from(old, User, User.id == old.c.user_id)
+                .where(old.c.expires_at > now),
+            )
+            .returning(RefreshToken.id)
+            .cte("inserted")
+        )
+        stmt = (
+            select(old.c.user_id, old.c.expires_at, User.name, User.created_at)
+            .select_from(old)
+            .outerjoin(User, User.id == old.c.user_id)
+            .add_cte(inserted)
+        )
+        row = (await self.writer.execute(stmt)).first()
+        return RotatedRefreshToken(*row) if row else None
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict
 
@@ -33,3 +34,18 @@ class RefreshRequest(BaseModel):
 
 class SessionLoginResponse(BaseModel):
     user: UserRead
+
+
+class IntrospectRequest(BaseModel):
+    tokens: list[str]
+
+
+class TokenIntrospection(BaseModel):
+    kind: Literal["session", "access"]
+    status: Literal["active", "expired", "revoked", "unknown"]
+    user_id: int | None = None
+    expires_in: int | None = None
+
+
+class IntrospectResponse(BaseModel):
+    results: list[TokenIntrospection]
@@ -1,28 +1,47 @@
 from datetime import datetime, timedelta, timezone
 
+import jwt
+
+from auth_app.core.cache import refresh_grace_cache, session_cache, session_epoch_cache
 from auth_app.core.config import settings
 from auth_app.core.db_manager import DBManager
 from auth_app.core.exceptions import (
     InvalidCredentialsError,
+    InvalidSessionCookieError,
     RefreshTokenExpiredError,
     RefreshTokenNotFoundError,
     UserAlreadyExistsError,
     UserNotFoundError,
 )
+from auth_app.core.metrics import timed
+from auth_app.core.password_rehasher import password_rehasher
+from auth_app.core.revocation import revocation_list, user_revocation_key
 from auth_app.core.security import security
-from auth_app.domain.schemas import TokenPair
+from auth_app.core.session_cookie import session_cookies
+from auth_app.core.singleflight import refresh_flight
+from auth_app.domain.models import User
+from auth_app.domain.schemas import TokenIntrospection, TokenPair
+from auth_app.domain.session_store import SessionRecord, get_session_store
 from auth_app.core.tokens import tokens
 
 
+def _rehash_if_needed(user: User, password: str) -> None:
+    """После успешного входа перехэширует пароль в фоне, если его стоимость вне политики."""
+    if settings.password_rehash_on_login and security.needs_rehash(user.password_hash):
+        password_rehasher.schedule(user.id, password, user.password_hash)
+
+
 class UserService:
     def __init__(self, db: DBManager):
         self.db = db
 
     async def register(self, name: str, password: str):
-        existing = await self.db.users.get_user_by_name(name)
-        if existing:
+        """Регистрация одним INSERT ... ON CONFLICT DO NOTHING, без предварительного SELECT;
+        гонка двух регистраций одного имени тоже заканчивается UserAlreadyExistsError."""
+        password_hash = await security.hash_password_async(password)
+        user = await self.db.users.create_user(name=name, password_hash=password_hash)
+        if user is None:
             raise UserAlreadyExistsError
-        user = await self.db.users.create_user(name=name, password_hash=security.hash_password(password))
         await self.db.session.commit()
         return user
 
@@ -30,79 +49,242 @@ class UserService:
 class AuthServiceSession:
     def __init__(self, db: DBManager):
         self.db = db
+        self.store = get_session_store(db)
 
     async def login(self, name: str, password: str):
         user = await self.db.users.get_user_by_name(name)
-        if not user or not security.verify_password(password, user.password_hash):
+        if not user or not await security.verify_password_async(password, user.password_hash):
             raise InvalidCredentialsError
-        raw_token, token_hash = tokens.generate_session_token()
+        _rehash_if_needed(user, password)
         now = datetime.now(timezone.utc)
         absolute_expires_at = now + timedelta(days=settings.session_absolute_timeout_days)
         expires_at = min(
             absolute_expires_at,
             now + timedelta(minutes=settings.session_extend_minutes),
         )
-        await self.db.auth.create_session(user_id=user.id, token_hash=token_hash, expires_at=expires_at)
-        await self.db.session.commit()
+        if settings.session_mode == "cookie":
+            # без записи в БД: всё состояние сессии уходит клиенту в куке; эпоху
+            # берём с основной БД, реплика могла не увидеть недавний logout
+            epoch = await self.db.users.get_session_epoch(user.id)
+            session_epoch_cache.set(user.id, epoch)
+            return user, session_cookies.issue(user.id, epoch, now, expires_at, absolute_expires_at)
+        raw_token, token_hash = tokens.generate_session_token()
+        await self.store.create_session(
+            user_id=user.id, token_hash=token_hash, expires_at=expires_at, created_at=now
+        )
         return user, raw_token
 
     async def logout(self, raw_token: str | None) -> None:
         if not raw_token:
             return
+        if settings.session_mode == "cookie":
+            await self._revoke_cookie_sessions(raw_token)
+            return
         token_hash = tokens.hash_session_token(raw_token)
-        stored = await self.db.auth.get_session_by_hash(token_hash)
-        if stored:
-            await self.db.auth.delete_session(stored)
+        session_cache.invalidate(token_hash)
+        await self.store.delete_session(token_hash)
+
+    async def _revoke_cookie_sessions(self, raw_token: str) -> None:
+        """Поднимает эпоху пользователя: гаснут все его cookie-сессии."""
+        try:
+            cookie = session_cookies.decode(raw_token)
+        except InvalidSessionCookieError:
+            return
+        epoch = await self.db.users.bump_session_epoch(cookie.user_id)
+        if epoch is not None:
             await self.db.session.commit()
+            session_epoch_cache.set(cookie.user_id, epoch)
 
 
 class AuthServiceJWT:
     def __init__(self, db: DBManager):
         self.db = db
+        self.store = get_session_store(db)
 
     async def login(self, name: str, password: str):
         user = await self._get_user_or_raise(name, password)
-        pair = await self._issue_tokens(user.id)
+        pair = await self._issue_tokens(user)
         return pair.access_token, pair.refresh_token
 
     async def refresh(self, raw_refresh_token: str):
-        stored = await self._get_valid_refresh(raw_refresh_token)
-        user = await self._get_user_for_token(stored.user_id)
-        await self.db.auth.delete_refresh_token(stored)  # можно удалять пачками через cron
-        pair = await self._issue_tokens(user.id)
-        return pair
+        """Ротирует refresh токен.
 
-    async def _get_valid_refresh(self, raw_refresh_token: str):
+        Одновременные запросы с одним токеном (несколько вкладок) склеиваются в
+        одну ротацию, а повторы в течение refresh_grace_seconds получают уже
+        выданную пару вместо 401.
+        """
         token_hash = tokens.hash_session_token(raw_refresh_token)
-        stored = await self.db.auth.get_refresh_token(token_hash)
-        if not stored or stored.revoked:
-            raise RefreshTokenNotFoundError
+        pair = refresh_grace_cache.get(token_hash)
+        if pair is not None:
+            return pair
+        return await refresh_flight.do(token_hash, lambda: self._rotate(token_hash))
+
+    @timed("jwt.rotate")
+    async def _rotate(self, token_hash: bytes) -> TokenPair:
+        new_refresh_token = tokens.create_refresh_token()
         now = datetime.now(timezone.utc)
-        if stored.expires_at <= now:
-            await self.db.auth.delete_refresh_token(stored)  # можно удалять пачками через cron
+        new_refresh_hash = tokens.hash_session_token(new_refresh_token)
+        rotated = await self.store.rotate_refresh_token(
+            token_hash=token_hash,
+            new_token_hash=new_refresh_hash,
+            new_expires_at=self._refresh_expiry(),
+            now=now,
+        )
+        if rotated is None:
+            raise RefreshTokenNotFoundError
+        if rotated.expires_at <= now:
             raise RefreshTokenExpiredError
-        return stored
+        name, created_at = rotated.user_name, rotated.user_created_at
+        if name is None:
+            # SQL-хранилище отдаёт пользователя сразу, остальные — только user_id
+            user = await self.db.users.get_user_by_id(rotated.user_id)
+            if not user:
+                await self.store.delete_refresh_token(new_refresh_hash)
+                raise UserNotFoundError
+            name, created_at = user.name, user.created_at
+        access_token = tokens.create_access_token(rotated.user_id, name, created_at)
+        pair = TokenPair(access_token=access_token, refresh_token=new_refresh_token)
+        refresh_grace_cache.set(token_hash, pair)
+        return pair
 
-    async def _get_user_for_token(self, user_id: int):
-        user = await self.db.users.get_user_by_id(user_id)
-        if not user:
-            raise UserNotFoundError
-        return user
+    async def logout(self, payload: dict, raw_refresh_token: str | None) -> None:
+        """Отзывает текущий access токен по jti и удаляет переданный refresh токен."""
+        if payload.get("jti"):
+            await self.db.auth.revoke_access_token(
+                jti=payload["jti"],
+                user_id=int(payload["sub"]),
+                revoked_at=datetime.now(timezone.utc),
+                expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+            )
+            await self.db.session.commit()
+            revocation_list.add(payload["jti"])
+        if raw_refresh_token:
+            await self.store.delete_refresh_token(tokens.hash_session_token(raw_refresh_token))
+
+    async def logout_all(self, user_id: int) -> int:
+        """Выход на всех устройствах: гасит refresh токены и все выданные до этого access токены.
+
+        Возвращает число отозванных refresh токенов.
+        """
+        revoked = await self.store.revoke_refresh_tokens(user_id)
+        now = datetime.now(timezone.utc)
+        key = user_revocation_key(user_id)
+        # позже этого срока все access токены, выданные до now, истекут сами
+        expires_at = now + timedelta(minutes=settings.access_token_expires_minutes, seconds=1)
+        await self.db.auth.revoke_access_token(jti=key, user_id=user_id, revoked_at=now, expires_at=expires_at)
+        await self.db.session.commit()
+        revocation_list.add(key)
+        return revoked
 
     async def _get_user_or_raise(self, name: str, password: str):
         user = await self.db.users.get_user_by_name(name)
-        if not user or not security.verify_password(password, user.password_hash):
+        if not user or not await security.verify_password_async(password, user.password_hash):
             raise InvalidCredentialsError
+        _rehash_if_needed(user, password)
         return user
 
     def _refresh_expiry(self) -> datetime:
         return datetime.now(timezone.utc) + timedelta(minutes=settings.refresh_token_expires_minutes)
 
-    async def _issue_tokens(self, user_id: int) -> TokenPair:
-        access_token = tokens.create_access_token(user_id)
+    @timed("jwt.issue_tokens")
+    async def _issue_tokens(self, user: User) -> TokenPair:
+        access_token = tokens.create_access_token(user.id, user.name, user.created_at)
         refresh_token = tokens.create_refresh_token()
         refresh_hash = tokens.hash_session_token(refresh_token)
         expires_at = self._refresh_expiry()
-        await self.db.auth.create_refresh_token(user_id=user_id, token_hash=refresh_hash, expires_at=expires_at)
-        await self.db.session.commit()
+        await self.store.create_refresh_token(user_id=user.id, token_hash=refresh_hash, expires_at=expires_at)
         return TokenPair(access_token=access_token, refresh_token=refresh_token)
+
+
+class IntrospectionService:
+    def __init__(self, db: DBManager):
+        self.db = db
+        self.store = get_session_store(db)
+
+    async def introspect(self, raw_tokens: list[str]) -> list[TokenIntrospection]:
+        """Проверяет пачку session-токенов и access JWT: JWT — локально,
+        сессии и пользователи — одним запросом на таблицу."""
+        now = datetime.now(timezone.utc)
+        results: list[TokenIntrospection | None] = [None] * len(raw_tokens)
+        access: dict[int, tuple[int, int]] = {}
+        maybe_revoked: dict[int, dict] = {}
+        session_hashes: dict[int, bytes] = {}
+        cookies = {}
+        for index, raw_token in enumerate(raw_tokens):
+            if raw_token.count(".") == 2:
+                try:
+                    payload = tokens.decode_token(raw_token, expected_type="access")
+                except jwt.ExpiredSignatureError:
+                    results[index] = TokenIntrospection(kind="access", status="expired")
+                except jwt.InvalidTokenError:
+                    results[index] = TokenIntrospection(kind="access", status="unknown")
+                else:
+                    access[index] = (int(payload["sub"]), payload["exp"])
+                    if revocation_list.candidates(payload):
+                        maybe_revoked[index] = payload
+            elif settings.session_mode == "cookie":
+                try:
+                    cookies[index] = session_cookies.decode(raw_token)
+                except InvalidSessionCookieError:
+                    results[index] = TokenIntrospection(kind="session", status="unknown")
+            else:
+                session_hashes[index] = tokens.hash_session_token(raw_token)
+
+        if maybe_revoked:
+            keys = {key for payload in maybe_revoked.values() for key in revocation_list.candidates(payload)}
+            revocations = await self.db.auth.get_revocations(list(keys))
+            for index, payload in maybe_revoked.items():
+                if revocation_list.matches(payload, revocations):
+                    del access[index]
+                    results[index] = TokenIntrospection(kind="access", status="revoked")
+        sessions = {}
+        if session_hashes:
+            sessions = await self.store.get_sessions(list(set(session_hashes.values())))
+        user_ids = {user_id for user_id, _ in access.values()}
+        user_ids.update(stored.user_id for stored in sessions.values())
+        users = await self.db.users.get_users_by_ids(list(user_ids)) if user_ids else {}
+        # эпохи — только с основной БД: реплика после logout-all ещё отдаёт старую
+        cookie_user_ids = list({cookie.user_id for cookie in cookies.values()})
+        epochs = await self.db.users.get_session_epochs(cookie_user_ids) if cookie_user_ids else {}
+
+        for index, (user_id, exp) in access.items():
+            if user_id not in users:
+                results[index] = TokenIntrospection(kind="access", status="unknown")
+                continue
+            expires_in = int(exp - now.timestamp())
+            results[index] = TokenIntrospection(
+                kind="access", status="active", user_id=user_id, expires_in=expires_in
+            )
+        for index, token_hash in session_hashes.items():
+            stored = sessions.get(token_hash)
+            if stored is None or stored.user_id not in users:
+                results[index] = TokenIntrospection(kind="session", status="unknown")
+                continue
+            results[index] = self._session_status(stored, now)
+        for index, cookie in cookies.items():
+            if epochs.get(cookie.user_id) != cookie.epoch:
+                results[index] = TokenIntrospection(kind="session", status="unknown")
+                continue
+            deadline = min(cookie.expires_at, cookie.absolute_expires_at)
+            if deadline <= now.timestamp():
+                results[index] = TokenIntrospection(kind="session", status="expired", user_id=cookie.user_id)
+                continue
+            results[index] = TokenIntrospection(
+                kind="session",
+                status="active",
+                user_id=cookie.user_id,
+                expires_in=int(deadline - now.timestamp()),
+            )
+        return results
+
+    def _session_status(self, stored: SessionRecord, now: datetime) -> TokenIntrospection:
+        absolute_expires_at = stored.created_at + timedelta(days=settings.session_absolute_timeout_days)
+        deadline = min(stored.expires_at, absolute_expires_at)
+        if deadline <= now:
+            return TokenIntrospection(kind="session", status="expired", user_id=stored.user_id)
+        return TokenIntrospection(
+            kind="session",
+            status="active",
+            user_id=stored.user_id,
+            expires_in=int((deadline - now).total_seconds()),
+        )
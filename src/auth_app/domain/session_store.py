@@ -0,0 +1,428 @@
+import json
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from typing import AbstractSet, Any, Protocol
+from uuid import UUID, uuid4
+
+from auth_app.core.config import settings
+from auth_app.core.db_manager import DBManager
+from auth_app.core.metrics import timed_methods
+from auth_app.core.session_flusher import session_flusher
+from auth_app.core.timing_wheel import HashedTimingWheel
+from auth_app.domain.models import UserSession
+from auth_app.domain.repositories import RotatedRefreshToken
+
+
+@dataclass
+class SessionRecord:
+    id: UUID
+    user_id: int
+    token_hash: bytes
+    expires_at: datetime
+    last_refreshed_at: datetime
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, model: UserSession) -> "SessionRecord":
+        return cls(
+            id=model.id,
+            user_id=model.user_id,
+            token_hash=model.token_hash,
+            expires_at=model.expires_at,
+            last_refreshed_at=model.last_refreshed_at,
+            created_at=model.created_at,
+        )
+
+
+@dataclass
+class RefreshTokenRecord:
+    user_id: int
+    token_hash: bytes
+    expires_at: datetime
+    revoked: bool = False
+
+
+class SessionStore(Protocol):
+    """Хранилище сессий и refresh токенов.
+
+    Изменяющие методы завершены сами по себе (SQL-бэкенд коммитит внутри),
+    get_* возвращают записи как есть, в том числе уже истёкшие, — решение
+    об истечении принимает вызывающий код.
+    """
+
+    async def create_session(
+        self, user_id: int, token_hash: bytes, expires_at: datetime, created_at: datetime
+    ) -> SessionRecord: ...
+
+    async def get_session(self, token_hash: bytes) -> SessionRecord | None: ...
+
+    async def get_sessions(self, token_hashes: list[bytes]) -> dict[bytes, SessionRecord]: ...
+
+    async def extend_session(
+        self, record: SessionRecord, expires_at: datetime, last_refreshed_at: datetime
+    ) -> None: ...
+
+    async def delete_session(self, token_hash: bytes) -> None: ...
+
+    async def create_refresh_token(self, user_id: int, token_hash: bytes, expires_at: datetime) -> None: ...
+
+    async def delete_refresh_token(self, token_hash: bytes) -> None: ...
+
+    async def revoke_refresh_tokens(self, user_id: int) -> int: ...
+
+    async def rotate_refresh_token(
+        self, token_hash: bytes, new_token_hash: bytes, new_expires_at: datetime, now: datetime
+    ) -> RotatedRefreshToken | None: ...
+
+
+@timed_methods("session_store")
+class SqlSessionStore:
+    """Хранилище поверх AuthRepository (таблицы sessions и refresh_tokens)."""
+
+    def __init__(self, db: DBManager):
+        self.db = db
+
+    async def create_session(
+        self, user_id: int, token_hash: bytes, expires_at: datetime, created_at: datetime
+    ) -> SessionRecord:
+        model = await self.db.auth.create_session(
+            user_id=user_id, token_hash=token_hash, expires_at=expires_at, created_at=created_at
+        )
+        await self.db.session.commit()
+        return SessionRecord.from_model(model)
+
+    async def get_session(self, token_hash: bytes) -> SessionRecord | None:
+        model = await self.db.auth.get_session_by_hash(token_hash)
+        return self._with_pending(SessionRecord.from_model(model)) if model else None
+
+    async def get_sessions(self, token_hashes: list[bytes]) -> dict[bytes, SessionRecord]:
+        models = await self.db.auth.get_sessions_by_hashes(token_hashes)
+        return {key: self._with_pending(SessionRecord.from_model(model)) for key, model in models.items()}
+
+    async def extend_session(
+        self, record: SessionRecord, expires_at: datetime, last_refreshed_at: datetime
+    ) -> None:
+        # продления пишутся в БД фоном пачками, запрос их не ждёт
+        session_flusher.record(record.id, expires_at, last_refreshed_at)
+
+    async def delete_session(self, token_hash: bytes) -> None:
+        session_id = await self.db.auth.delete_session_by_hash(token_hash)
+        if session_id:
+            session_flusher.discard(session_id)
+            await self.db.session.commit()
+
+    async def create_refresh_token(self, user_id: int, token_hash: bytes, expires_at: datetime) -> None:
+        await self.db.auth.create_refresh_token(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
+        await self.db.session.commit()
+
+    async def delete_refresh_token(self, token_hash: bytes) -> None:
+        if await self.db.auth.delete_refresh_token_by_hash(token_hash):
+            await self.db.session.commit()
+
+    async def revoke_refresh_tokens(self, user_id: int) -> int:
+        revoked = await self.db.auth.revoke_refresh_tokens(user_id)
+        await self.db.session.commit()
+        return revoked
+
+    async def rotate_refresh_token(
+        self, token_hash: bytes, new_token_hash: bytes, new_expires_at: datetime, now: datetime
+    ) -> RotatedRefreshToken | None:
+        rotated = await self.db.auth.rotate_refresh_token(token_hash, new_token_hash, new_expires_at, now)
+        if rotated is not None:
+            await self.db.session.commit()
+        return rotated
+
+    def _with_pending(self, record: SessionRecord) -> SessionRecord:
+        """Накладывает ещё не записанное в БД rolling-продление."""
+        pending = session_flusher.pending(record.id)
+        if pending is not None:
+            expires_at, last_refreshed_at = pending
+            record.expires_at = max(record.expires_at, expires_at)
+            record.last_refreshed_at = max(record.last_refreshed_at, last_refreshed_at)
+        return record
+
+
+@timed_methods("session_store")
+class MemorySessionStore:
+    """Хранилище в памяти процесса; истечение — через хэшированное колесо таймеров.
+
+    Подходит для одного воркера и тестов: данные не переживают рестарт и не
+    видны другим процессам.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 4096):
+        self._sessions: dict[bytes, SessionRecord] = {}
+        self._refresh_tokens: dict[bytes, RefreshTokenRecord] = {}
+        self._refresh_by_user: dict[int, set[bytes]] = {}
+        self._wheel = HashedTimingWheel(tick_seconds=tick_seconds, slots=slots)
+
+    async def create_session(
+        self, user_id: int, token_hash: bytes, expires_at: datetime, created_at: datetime
+    ) -> SessionRecord:
+        self._expire()
+        record = SessionRecord(uuid4(), user_id, token_hash, expires_at, created_at, created_at)
+        self._sessions[token_hash] = record
+        self._wheel.schedule(("session", token_hash), expires_at.timestamp())
+        return replace(record)
+
+    async def get_session(self, token_hash: bytes) -> SessionRecord | None:
+        self._expire()
+        record = self._sessions.get(token_hash)
+        return replace(record) if record else None
+
+    async def get_sessions(self, token_hashes: list[bytes]) -> dict[bytes, SessionRecord]:
+        self._expire()
+        return {key: replace(self._sessions[key]) for key in token_hashes if key in self._sessions}
+
+    async def extend_session(
+        self, record: SessionRecord, expires_at: datetime, last_refreshed_at: datetime
+    ) -> None:
+        stored = self._sessions.get(record.token_hash)
+        if stored is None:
+            return
+        stored.expires_at = expires_at
+        stored.last_refreshed_at = last_refreshed_at
+        self._wheel.schedule(("session", record.token_hash), expires_at.timestamp())
+
+    async def delete_session(self, token_hash: bytes) -> None:
+        self._sessions.pop(token_hash, None)
+
+    async def create_refresh_token(self, user_id: int, token_hash: bytes, expires_at: datetime) -> None:
+        self._expire()
+        self._refresh_tokens[token_hash] = RefreshTokenRecord(user_id, token_hash, expires_at)
+        self._refresh_by_user.setdefault(user_id, set()).add(token_hash)
+        self._wheel.schedule(("refresh", token_hash), expires_at.timestamp())
+
+    async def delete_refresh_token(self, token_hash: bytes) -> None:
+        self._drop_refresh_token(token_hash)
+
+    async def revoke_refresh_tokens(self, user_id: int) -> int:
+        token_hashes = self._refresh_by_user.pop(user_id, set())
+        for token_hash in token_hashes:
+            del self._refresh_tokens[token_hash]
+        return len(token_hashes)
+
+    async def rotate_refresh_token(
+        self, token_hash: bytes, new_token_hash: bytes, new_expires_at: datetime, now: datetime
+    ) -> RotatedRefreshToken | None:
+        self._expire()
+        old = self._refresh_tokens.get(token_hash)
+        if old is None or old.revoked:
+            return None
+        self._drop_refresh_token(token_hash)
+        if old.expires_at > now:
+            await self.create_refresh_token(old.user_id, new_token_hash, new_expires_at)
+        return RotatedRefreshToken(old.user_id, old.expires_at, None, None)
+
+    def _expire(self) -> None:
+        now = time.time()
+        for kind, key in self._wheel.advance(now):
+            records = self._sessions if kind == "session" else self._refresh_tokens
+            record = records.get(key)
+            # ключ мог быть продлён: тогда в колесе уже лежит более поздняя запись
+            if record is not None and record.expires_at.timestamp() <= now:
+                if kind == "session":
+                    del records[key]
+                else:
+                    self._drop_refresh_token(key)
+
+    def _drop_refresh_token(self, token_hash: bytes) -> None:
+        record = self._refresh_tokens.pop(token_hash, None)
+        if record is not None:
+            user_tokens = self._refresh_by_user.get(record.user_id)
+            if user_tokens is not None:
+                user_tokens.discard(token_hash)
+                if not user_tokens:
+                    del self._refresh_by_user[record.user_id]
+
+
+class KeyValueClient(Protocol):
+    """Минимальное подмножество API redis.asyncio.Redis, нужное хранилищу."""
+
+    async def get(self, name: str) -> bytes | None: ...
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]: ...
+
+    async def set(self, name: str, value: bytes, px: int | None = None) -> Any: ...
+
+    async def getdel(self, name: str) -> bytes | None: ...
+
+    async def delete(self, *names: str) -> int: ...
+
+    async def sadd(self, name: str, *values: str) -> int: ...
+
+    async def smembers(self, name: str) -> AbstractSet[bytes]: ...
+
+    async def pexpire(self, name: str, milliseconds: int) -> bool: ...
+
+
+class LocalKeyValueClient:
+    """Локальная замена Redis в памяти процесса с тем же протоколом (для тестов)."""
+
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+
+    async def get(self, name: str) -> bytes | None:
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        value, deadline = entry
+        if deadline is not None and deadline <= time.time():
+            del self._data[name]
+            return None
+        return value
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, name: str, value: bytes, px: int | None = None) -> bool:
+        self._data[name] = (value, time.time() + px / 1000 if px is not None else None)
+        return True
+
+    async def getdel(self, name: str) -> bytes | None:
+        value = await self.get(name)
+        self._data.pop(name, None)
+        return value
+
+    async def delete(self, *names: str) -> int:
+        return sum(self._data.pop(name, None) is not None for name in names)
+
+    async def sadd(self, name: str, *values: str) -> int:
+        members = await self.smembers(name)
+        added = {value.encode("utf-8") for value in values} - members
+        deadline = self._data[name][1] if name in self._data else None
+        self._data[name] = (members | added, deadline)
+        return len(added)
+
+    async def smembers(self, name: str) -> AbstractSet[bytes]:
+        return set(await self.get(name) or ())
+
+    async def pexpire(self, name: str, milliseconds: int) -> bool:
+        if await self.get(name) is None:
+            return False
+        self._data[name] = (self._data[name][0], time.time() + milliseconds / 1000)
+        return True
+
+
+@timed_methods("session_store")
+class KeyValueSessionStore:
+    """Хранилище поверх Redis-подобного KV: запись — JSON, TTL ставит сам KV."""
+
+    session_prefix = "auth:session:"
+    refresh_prefix = "auth:refresh:"
+    user_refresh_prefix = "auth:user-refresh:"
+
+    def __init__(self, client: KeyValueClient):
+        self.client = client
+
+    async def create_session(
+        self, user_id: int, token_hash: bytes, expires_at: datetime, created_at: datetime
+    ) -> SessionRecord:
+        record = SessionRecord(uuid4(), user_id, token_hash, expires_at, created_at, created_at)
+        await self._put(self.session_prefix + token_hash.hex(), record, expires_at)
+        return record
+
+    async def get_session(self, token_hash: bytes) -> SessionRecord | None:
+        return _load(SessionRecord, await self.client.get(self.session_prefix + token_hash.hex()))
+
+    async def get_sessions(self, token_hashes: list[bytes]) -> dict[bytes, SessionRecord]:
+        if not token_hashes:
+            return {}
+        values = await self.client.mget([self.session_prefix + key.hex() for key in token_hashes])
+        records = {key: _load(SessionRecord, value) for key, value in zip(token_hashes, values)}
+        return {key: record for key, record in records.items() if record is not None}
+
+    async def extend_session(
+        self, record: SessionRecord, expires_at: datetime, last_refreshed_at: datetime
+    ) -> None:
+        extended = replace(record, expires_at=expires_at, last_refreshed_at=last_refreshed_at)
+        await self._put(self.session_prefix + record.token_hash.hex(), extended, expires_at)
+
+    async def delete_session(self, token_hash: bytes) -> None:
+        await self.client.delete(self.session_prefix + token_hash.hex())
+
+    async def create_refresh_token(self, user_id: int, token_hash: bytes, expires_at: datetime) -> None:
+        record = RefreshTokenRecord(user_id, token_hash, expires_at)
+        await self._put(self.refresh_prefix + token_hash.hex(), record, expires_at)
+        # индекс токенов пользователя для revoke_refresh_tokens; живёт не меньше самого свежего токена
+        index_key = self.user_refresh_prefix + str(user_id)
+        await self.client.sadd(index_key, token_hash.hex())
+        await self.client.pexpire(index_key, _ttl_ms(expires_at))
+
+    async def delete_refresh_token(self, token_hash: bytes) -> None:
+        await self.client.delete(self.refresh_prefix + token_hash.hex())
+
+    async def revoke_refresh_tokens(self, user_id: int) -> int:
+        index_key = self.user_refresh_prefix + str(user_id)
+        members = await self.client.smembers(index_key)
+        keys = [self.refresh_prefix + member.decode("utf-8") for member in members]
+        revoked = await self.client.delete(*keys) if keys else 0
+        await self.client.delete(index_key)
+        return revoked
+
+    async def rotate_refresh_token(
+        self, token_hash: bytes, new_token_hash: bytes, new_expires_at: datetime, now: datetime
+    ) -> RotatedRefreshToken | None:
+        # GETDEL атомарен: из параллельных ротаций старый токен получит только одна
+        old = _load(RefreshTokenRecord, await self.client.getdel(self.refresh_prefix + token_hash.hex()))
+        if old is None or old.revoked:
+            return None
+        if old.expires_at > now:
+            await self.create_refresh_token(old.user_id, new_token_hash, new_expires_at)
+        return RotatedRefreshToken(old.user_id, old.expires_at, None, None)
+
+    async def _put(self, key: str, record: SessionRecord | RefreshTokenRecord, expires_at: datetime) -> None:
+        await self.client.set(key, _dump(record), px=_ttl_ms(expires_at))
+
+
+def _ttl_ms(expires_at: datetime) -> int:
+    return max(int((expires_at - datetime.now(timezone.utc)).total_seconds() * 1000), 1)
+
+
+def _dump(record: SessionRecord | RefreshTokenRecord) -> bytes:
+    data = asdict(record)
+    data["token_hash"] = record.token_hash.hex()
+    return json.dumps(data, default=str).encode("utf-8")
+
+
+def _load(cls, value: bytes | None):
+    if value is None:
+        return None
+    data = json.loads(value)
+    for field in ("expires_at", "last_refreshed_at", "created_at"):
+        if field in data:
+            data[field] = datetime.fromisoformat(data[field])
+    if "id" in data:
+        data["id"] = UUID(data["id"])
+    data["token_hash"] = bytes.fromhex(data["token_hash"])
+    return cls(**data)
+
+
+_shared_store: MemorySessionStore | KeyValueSessionStore | None = None
+
+
+def get_session_store(db: DBManager) -> SessionStore:
+    """Хранилище по настройке session_store_backend.
+
+    SQL-хранилище живёт в рамках DBManager запроса, остальные — общие на процесс.
+    """
+    global _shared_store
+    if settings.session_store_backend == "sql":
+        return SqlSessionStore(db)
+    if _shared_store is None:
+        if settings.session_store_backend == "memory":
+            _shared_store = MemorySessionStore()
+        else:
+            _shared_store = KeyValueSessionStore(_create_kv_client())
+    return _shared_store
+
+
+def _create_kv_client() -> KeyValueClient:
+    if not settings.session_store_kv_url:
+        return LocalKeyValueClient()
+    try:
+        import redis.asyncio
+    except ImportError as err:
+        raise RuntimeError("SESSION_STORE_KV_URL requires the 'redis' extra: pip install 'session-vs-jwt[redis]'") from err
+    return redis.asyncio.from_url(settings.session_store_kv_url)
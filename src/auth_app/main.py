@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -7,14 +8,43 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
 from auth_app.core.config import settings
-from auth_app.core.db import init_db
-from auth_app.api.routes import jwt, session, users
+from auth_app.core.db import dispose_engines, engine, init_db, prewarm_pool, read_engines
+from auth_app.core.metrics import instrument_engine
+from auth_app.core.partition_maintainer import partition_maintainer
+from auth_app.core.password_rehasher import password_rehasher
+from auth_app.core.profiler import profiler
+from auth_app.core.reaper import reaper
+from auth_app.core.revocation import revocation_list
+from auth_app.core.security import security
+from auth_app.core.session_flusher import session_flusher
+from auth_app.api.middleware import MetricsMiddleware, ProfilerMiddleware
+from auth_app.api.routes import introspect, jwks, jwt, metrics, session, stats, users
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await asyncio.to_thread(security.calibrate)
+    if settings.db_pool_prewarm:
+        await prewarm_pool(settings.db_pool_prewarm)
+    session_flusher.start()
+    if settings.profiler_enabled:
+        profiler.install_signal_handler()
+    if settings.db_partitioned_tokens:
+        partition_maintainer.start()
+    await revocation_list.start()
+    if settings.reaper_enabled and settings.session_store_backend == "sql":
+        reaper.start()
     yield
+    try:
+        await reaper.stop()
+        await partition_maintainer.stop()
+        await revocation_list.stop()
+        await session_flusher.stop()
+        await password_rehasher.stop()
+    finally:
+        security.shutdown()
+        await dispose_engines()
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
@@ -31,9 +61,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.metrics_enabled:
+    for target in [engine, *read_engines]:
+        instrument_engine(target)
+    app.add_middleware(MetricsMiddleware)
+if settings.profiler_enabled:
+    app.add_middleware(ProfilerMiddleware)
 app.include_router(users.router)
 app.include_router(session.router)
 app.include_router(jwt.router)
+app.include_router(jwks.router)
+app.include_router(introspect.router)
+app.include_router(stats.router)
+app.include_router(metrics.router)
 static_dir = Path(__file__).resolve().parent / "static"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
@@ -0,0 +1,31 @@
+from auth_app.cli.import_users import _read_chunks
+
+
+def _write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content.encode("utf-8"))
+    return path
+
+
+def test_csv_keeps_password_whitespace(tmp_path):
+    path = _write(tmp_path, "users.csv", '\ufeffname,password\r\nalice,  secret  \r\nbob," quoted "\r\n')
+    chunks = list(_read_chunks(path, "csv", 0, 10))
+    assert chunks == [([("alice", "  secret  "), ("bob", " quoted ")], path.stat().st_size)]
+
+
+def test_csv_quoted_newline_and_resume(tmp_path):
+    path = _write(tmp_path, "users.csv", 'name,password\nalice,"two\nlines"\n\nbob,пароль\ncarol,x\n')
+    first, second = _read_chunks(path, "csv", 0, 2)
+    assert first[0] == [("alice", "two\nlines"), ("bob", "пароль")]
+    assert second[0] == [("carol", "x")]
+    resumed = list(_read_chunks(path, "csv", first[1], 2))
+    assert resumed == [second]
+
+
+def test_jsonl_keeps_password_whitespace(tmp_path):
+    path = _write(
+        tmp_path, "users.jsonl", '{"name": "alice", "password": " secret "}\n\n{"name": "bob", "password": "x"}\n'
+    )
+    first, second = _read_chunks(path, "jsonl", 0, 1)
+    assert first[0] == [("alice", " secret ")]
+    assert list(_read_chunks(path, "jsonl", first[1], 1)) == [second]
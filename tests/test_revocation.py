@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from auth_app.core.revocation import RevocationList, user_revocation_key
+
+
+def _matches(issued_at: float, logout_at: float) -> bool:
+    revocation = SimpleNamespace(revoked_at=datetime.fromtimestamp(logout_at, timezone.utc))
+    payload = {"sub": "1", "iat": int(issued_at)}
+    return RevocationList().matches(payload, {user_revocation_key(1): revocation})
+
+
+def test_token_issued_before_logout_in_same_second_is_revoked():
+    assert _matches(issued_at=1_700_000_000.2, logout_at=1_700_000_000.9)
+
+
+def test_token_issued_after_logout_in_same_second_is_revoked():
+    # по целому iat его не отличить от выданного до выхода
+    assert _matches(issued_at=1_700_000_000.9, logout_at=1_700_000_000.2)
+
+
+def test_token_issued_in_next_second_survives():
+    assert not _matches(issued_at=1_700_000_001.0, logout_at=1_700_000_000.9)
+
+
+def test_token_issued_earlier_is_revoked():
+    assert _matches(issued_at=1_699_999_999.9, logout_at=1_700_000_000.0)
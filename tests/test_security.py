@@ -0,0 +1,10 @@
+from auth_app.core.security import Security
+
+
+def test_needs_rehash_only_below_current_cost(monkeypatch):
+    security = Security()
+    monkeypatch.setattr(Security, "rounds", 12)
+    assert security.needs_rehash("$2b$11$" + "x" * 53)
+    assert not security.needs_rehash("$2b$12$" + "x" * 53)
+    assert not security.needs_rehash("$2b$13$" + "x" * 53)
+    assert security.needs_rehash("not-a-bcrypt-hash")